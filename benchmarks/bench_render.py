@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Rasterizer microbenchmark
+Compares qrcode's per-module PIL drawing with the NumPy rasterizer used by
+QRGenerator.generate_qr for QR versions 1-40, checking that pixels match.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrcode
+from qrgenn import render_modules
+
+
+def best_time(func, repeat):
+    """Return the best wall time of repeat calls to func"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy rasterizer against qrcode's PIL drawing")
+    parser.add_argument('-s', '--size', type=int, default=10, help='Box size (default: 10)')
+    parser.add_argument('-b', '--border', type=int, default=4, help='Border size (default: 4)')
+    parser.add_argument('-f', '--fill-color', default='black', help='Fill color (default: black)')
+    parser.add_argument('-bg', '--back-color', default='white', help='Background color (default: white)')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Repeats per version (default: 5)')
+    args = parser.parse_args()
+
+    print(f"{'version':>7} {'qrcode ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for version in range(1, 41):
+        qr = qrcode.QRCode(version=version, box_size=args.size, border=args.border)
+        qr.add_data('benchmark')
+        qr.make(fit=False)
+
+        def stock():
+            return qr.make_image(fill_color=args.fill_color, back_color=args.back_color).get_image()
+
+        def vectorized():
+            return render_modules(qr.modules, args.size, args.border, args.fill_color, args.back_color)
+
+        expected, actual = stock(), vectorized()
+        if actual is None or expected.mode != actual.mode or expected.tobytes() != actual.tobytes():
+            print(f"version {version}: NumPy output does not match qrcode output", file=sys.stderr)
+            sys.exit(1)
+
+        stock_time = best_time(stock, args.repeat)
+        numpy_time = best_time(vectorized, args.repeat)
+        print(f"{version:>7} {stock_time * 1000:>10.2f} {numpy_time * 1000:>10.2f} {stock_time / numpy_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the generation pipeline
+Times generate_qr across QR versions and error correction levels, save_qr for
+every output format, add_logo, create_rounded_qr, CLI startup and end-to-end
+--batch throughput. Inputs are generated from fixed seeds and nothing touches the
+network. Results are written as JSON and can be compared against an earlier
+run, failing when a benchmark got slower than the regression threshold.
+
+    python benchmarks/run_benchmarks.py -o before.json
+    python benchmarks/run_benchmarks.py -o after.json --compare before.json
+    python benchmarks/run_benchmarks.py --compare before.json --against after.json
+"""
+
+import argparse
+import fnmatch
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrcode
+import PIL
+from PIL import Image, ImageDraw
+import qrgenn
+from qrgenn import QRGenerator
+
+RESULTS_VERSION = 1
+
+VERSIONS = (1, 5, 10, 20, 30, 40)
+ERROR_CORRECTION_LEVELS = ('L', 'M', 'Q', 'H')
+SAVE_FORMATS = tuple(QRGenerator().supported_formats)
+BATCH_LINES = 200
+
+
+def payload(version, level, seed=0):
+    """Return deterministic byte-mode text that fills most of a version at a level"""
+    ecc = QRGenerator().get_error_correction(level)
+    bits = qrcode.util.BIT_LIMIT_TABLE[ecc][version]
+    # Mode indicator plus the widest character count field
+    length = (bits - 4 - 16) // 8 * 9 // 10
+    rng = random.Random(f"{seed}-{version}-{level}")
+    return ''.join(rng.choice(string.ascii_lowercase + string.punctuation) for _ in range(length))
+
+
+def make_logo(path, size=256):
+    """Draw a synthetic RGBA logo so the logo benchmark needs no fixture files"""
+    logo = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(logo)
+    draw.ellipse((0, 0, size - 1, size - 1), fill=(200, 30, 60, 255))
+    draw.rectangle((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(255, 255, 255, 200))
+    logo.save(path)
+    return path
+
+
+def measure(func, repeat):
+    """Time func with timeit, returning per-call seconds for each of repeat samples"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return [sample / number for sample in timer.repeat(repeat=repeat, number=number)]
+
+
+def expect(result):
+    """Unwrap a (value, error) pair, failing the benchmark on error"""
+    value, error = result
+    if error:
+        raise RuntimeError(error)
+    return value
+
+
+def generate_cases():
+    """generate_qr for each version and error correction level"""
+    generator = QRGenerator()
+    for version in VERSIONS:
+        for level in ERROR_CORRECTION_LEVELS:
+            text = payload(version, level)
+            yield (f"generate/v{version}-{level}",
+                   lambda text=text, version=version, level=level: expect(generator.generate_qr(
+                       text, version=version, error_correction=level)))
+
+
+def save_cases():
+    """save_qr for each output format, into memory so disk speed does not count"""
+    generator = QRGenerator()
+    text = payload(10, 'M')
+    for format_type in SAVE_FORMATS:
+        img = expect(generator.generate_qr(text, version=10, format_type=format_type))
+        yield (f"save/{format_type}",
+               lambda img=img, format_type=format_type: generator.save_qr(img, io.BytesIO(), format_type))
+
+
+def decoration_cases(workdir):
+    """add_logo and create_rounded_qr on a version 10 code"""
+    generator = QRGenerator()
+    img = expect(generator.generate_qr(payload(10, 'H'), version=10, error_correction='H'))
+    logo_path = make_logo(str(Path(workdir) / 'logo.png'))
+    yield "logo", lambda: expect(generator.add_logo(img.copy(), logo_path))
+    yield "rounded", lambda: expect(generator.create_rounded_qr(img))
+
+
+def startup_cases(workdir):
+    """Fresh interpreter runs: importing the module, --help and a one-off --quiet PNG"""
+    script = str(Path(qrgenn.__file__))
+    commands = {
+        'startup/import': [sys.executable, '-c', 'import qrgenn'],
+        'startup/help': [sys.executable, script, '--help'],
+        'startup/png': [sys.executable, script, 'https://example.com/startup',
+                        '-o', str(Path(workdir) / 'startup.png'), '--quiet'],
+    }
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (
+        str(Path(script).parent), os.environ.get('PYTHONPATH')))))
+    for name, command in commands.items():
+        yield name, lambda command=command: subprocess.run(command, check=True, env=env,
+                                                          stdout=subprocess.DEVNULL)
+
+
+def batch_case(workdir, lines, jobs):
+    """Run the CLI in --batch mode end to end, returning seconds per code"""
+    input_path = Path(workdir) / 'batch.txt'
+    rng = random.Random('batch')
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for _ in range(lines):
+            f.write(''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(80)) + '\n')
+    output_dir = Path(workdir) / 'batch'
+    command = [sys.executable, str(Path(qrgenn.__file__)), '--batch', str(input_path),
+               '-o', str(output_dir / 'code.png'), '--jobs', str(jobs), '--quiet']
+
+    def run():
+        # Batch outputs are named relative to the working directory
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, cwd=workdir)
+
+    return run
+
+
+def run_suite(pattern, repeat, batch_lines, jobs):
+    """Run every benchmark whose name matches pattern, returning the results dict"""
+    results = {}
+    # Time the steady state of long-running processes, where NumPy is
+    # loaded whatever the size of the code
+    qrgenn.load_numpy()
+    with tempfile.TemporaryDirectory() as workdir:
+        cases = [*generate_cases(), *save_cases(), *decoration_cases(workdir), *startup_cases(workdir)]
+        for name, func in cases:
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            samples = measure(func, repeat)
+            results[name] = summarize(samples, 'call')
+            report(name, results[name])
+
+        name = f"batch/jobs{jobs}"
+        if batch_lines and fnmatch.fnmatch(name, pattern):
+            run = batch_case(workdir, batch_lines, jobs)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                samples.append((time.perf_counter() - start) / batch_lines)
+            results[name] = summarize(samples, 'code')
+            report(name, results[name])
+    return results
+
+
+def summarize(samples, unit):
+    """Reduce per-call samples to the statistics stored in the results file"""
+    return {
+        'unit': unit,
+        'median': statistics.median(samples),
+        'min': min(samples),
+        'max': max(samples),
+        'samples': len(samples),
+    }
+
+
+def report(name, result):
+    """Print one benchmark line"""
+    print(f"{name:<24} {result['median'] * 1000:>10.3f} ms/{result['unit']}"
+          f"  (min {result['min'] * 1000:.3f}, max {result['max'] * 1000:.3f})")
+
+
+def environment():
+    """Describe the interpreter and library versions the results were taken with"""
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'qrcode': getattr(qrcode, '__version__', None) or _distribution_version('qrcode'),
+        'pillow': PIL.__version__,
+        'numpy': numpy_version,
+    }
+
+
+def _distribution_version(name):
+    """Installed version of a distribution, or None"""
+    try:
+        from importlib.metadata import version
+        return version(name)
+    except Exception:
+        return None
+
+
+def load_results(path):
+    """Read a results file written by this script"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('results_version') != RESULTS_VERSION:
+        raise ValueError(f"{path}: unsupported results version {data.get('results_version')}")
+    return data
+
+
+def compare(baseline, current, threshold):
+    """Print median changes against baseline and return the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':<24} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<24} {'-':>12} {result['median'] * 1000:>12.3f} {'new':>8}")
+            continue
+        change = result['median'] / before['median'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<24} {before['median'] * 1000:>12.3f} {result['median'] * 1000:>12.3f} "
+              f"{change:>+8.1%}{flag}")
+    if baseline['environment'] != current['environment']:
+        print("\nWarning: results were taken in different environments", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the QR generation pipeline")
+    parser.add_argument('-o', '--output', help='Write results as JSON to this file')
+    parser.add_argument('-k', '--filter', default='*',
+                       help="Only run benchmarks matching this glob, e.g. 'generate/*' (default: all)")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Samples per benchmark (default: 5)')
+    parser.add_argument('--batch-lines', type=int, default=BATCH_LINES,
+                       help=f'Lines in the --batch benchmark, 0 to skip it (default: {BATCH_LINES})')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='--jobs for the --batch benchmark (default: 1)')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare against a previous results file')
+    parser.add_argument('--against', metavar='RESULTS',
+                       help='With --compare, compare this results file instead of running the suite')
+    parser.add_argument('-t', '--threshold', type=float, default=0.10,
+                       help='Relative slowdown counted as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    if args.against and not args.compare:
+        parser.error('--against requires --compare')
+
+    if args.against:
+        current = load_results(args.against)
+    else:
+        current = {
+            'results_version': RESULTS_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'environment': environment(),
+            'repeat': args.repeat,
+            'results': run_suite(args.filter, args.repeat, args.batch_lines, args.jobs),
+        }
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(current, f, indent=2)
+                f.write('\n')
+
+    if args.compare:
+        regressions = compare(load_results(args.compare), current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than the {args.threshold:.0%} threshold: "
+                  f"{', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3046 @@
+"""
+QR Code  Generator CLI Application
+Implementation of the qrgenn.py command-line tool, kept in an importable
+module so that Python caches it as bytecode.
+Compatible with standard qrcode library.
+"""
+
+import argparse
+import collections
+import contextlib
+import functools
+import io
+import itertools
+import sys
+import os
+import posixpath
+import threading
+import time
+from pathlib import Path
+import qrcode
+from qrcode.image.pil import PilImage
+from PIL import Image, ImageColor
+
+# Public API re-exported by qrgenn.py. Module state (np, the tuning constants)
+# stays here: set it on qrgenn_core, not on qrgenn.
+__all__ = [
+    'load_numpy', 'use_numpy', 'StageStats', 'QRGenerator', 'RenderedImage',
+    'render_modules', 'SvgPathImage', 'PackedMatrix', 'TextQRImage', 'segment_text',
+    'segments_bit_length', 'fit_version', 'mask_patterns', 'mask_penalties',
+    'VersionTemplate', 'version_template', 'NumpyQRCode', 'print_banner',
+    'print_success', 'print_error', 'print_info', 'print_warning', 'validate_color',
+    'get_text_input', 'get_filename_input', 'interactive_mode', 'batch_output_name',
+    'result_cache_key', 'atomic_output', 'copy_output', 'ResultCache',
+    'BatchCheckpoint', 'batch_checkpoint_path', 'open_batch_source',
+    'iter_batch_lines', 'BatchRow', 'batch_input_format', 'batch_row',
+    'iter_batch_rows', 'batch_options_from_args', 'build_qr_image',
+    'encode_batch_item', 'write_batch_item', 'archive_batch_item',
+    'process_batch_item', 'copy_batch_duplicate', 'BatchItem', 'BatchWriter',
+    'ArchiveSink', 'run_batch', 'merge_params', 'validate_options', 'parse_rendition',
+    'save_renditions', 'QRServer', 'main',
+]
+
+# Optional and rarely used subsystems (NumPy, SVG, colour output, the HTTP
+# server, process pools, caching, batch queues, JSON) are imported where
+# they are first used, so a plain one-off run only pays for qrcode and PIL
+# at startup.
+
+# NumPy module once load_numpy() has imported it
+np = None
+_numpy_missing = False
+
+def load_numpy():
+    """Import NumPy on first use, returning it or None when it is not installed"""
+    global np, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:  # NumPy is optional; without it the stock qrcode renderer is used
+            _numpy_missing = True
+        else:
+            np = numpy
+    return np
+
+# Smallest QR version whose faster NumPy encode repays importing NumPy
+# within a single code
+NUMPY_MIN_VERSION = 25
+
+def use_numpy(version):
+    """Whether to encode and render a code of this version with NumPy.
+
+    Before NumPy is loaded, only codes large enough to repay the import use it.
+    """
+    if np is not None:
+        return True
+    return version >= NUMPY_MIN_VERSION and load_numpy() is not None
+
+@functools.lru_cache(maxsize=None)
+def _colorama():
+    """Import colorama and set it up for cross-platform coloured output"""
+    import colorama
+    colorama.init()
+    return colorama
+
+class _LazyAnsi:
+    """Stand-in for colorama's Fore/Style that imports colorama on first use"""
+    
+    def __init__(self, name):
+        self._name = name
+    
+    def __getattr__(self, attr):
+        return getattr(getattr(_colorama(), self._name), attr)
+
+Fore = _LazyAnsi('Fore')
+Style = _LazyAnsi('Style')
+
+class StageStats:
+    """Per-stage wall time and call counts for the generation pipeline.
+
+    Also counts QR versions and events such as cache hits. Snapshots are plain
+    dicts, so worker processes can send theirs to the parent to merge. Safe to
+    update from several threads.
+    """
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Clear all counters"""
+        # stage -> [calls, total seconds, slowest call in seconds]
+        self.stages = {}
+        self.versions = collections.Counter()
+        self.events = collections.Counter()
+    
+    @contextlib.contextmanager
+    def time(self, stage):
+        """Context manager recording the wall time of one stage call"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+    
+    def record(self, stage, seconds):
+        """Record one call of a stage"""
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+    
+    def record_version(self, version):
+        """Count a generated code of a QR version"""
+        with self._lock:
+            self.versions[version] += 1
+    
+    def count(self, event, n=1):
+        """Count an event, e.g. a cache hit"""
+        with self._lock:
+            self.events[event] += n
+    
+    def snapshot(self):
+        """Counters as plain, picklable data"""
+        with self._lock:
+            return self._snapshot()
+    
+    def _snapshot(self):
+        """snapshot() for callers already holding the lock"""
+        return {
+            'stages': {stage: list(entry) for stage, entry in self.stages.items()},
+            'versions': dict(self.versions),
+            'events': dict(self.events),
+        }
+    
+    def drain(self):
+        """Return a snapshot and reset the counters"""
+        with self._lock:
+            snapshot = self._snapshot()
+            self.reset()
+        return snapshot
+    
+    def merge(self, snapshot):
+        """Add the counters of a snapshot, e.g. from a worker process"""
+        with self._lock:
+            for stage, (calls, total, slowest) in snapshot['stages'].items():
+                entry = self.stages.setdefault(stage, [0, 0.0, 0.0])
+                entry[0] += calls
+                entry[1] += total
+                entry[2] = max(entry[2], slowest)
+            self.versions.update(snapshot['versions'])
+            self.events.update(snapshot['events'])
+    
+    @staticmethod
+    def peak_rss():
+        """Peak resident set size in bytes of this process and of its children"""
+        try:
+            import resource
+        except ImportError:  # Not available on Windows; peak RSS is then not reported
+            return None, None
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+    
+    def report(self):
+        """Full report as a JSON-serializable dict"""
+        peak_rss, peak_children_rss = self.peak_rss()
+        snapshot = self.snapshot()
+        return {
+            'wall_seconds': time.perf_counter() - self.started,
+            'stages': {stage: {'calls': calls, 'seconds': total, 'max_seconds': slowest}
+                       for stage, (calls, total, slowest) in sorted(snapshot['stages'].items())},
+            'versions': {str(version): count for version, count in sorted(snapshot['versions'].items())},
+            'events': dict(sorted(snapshot['events'].items())),
+            'peak_rss_bytes': peak_rss,
+            'peak_children_rss_bytes': peak_children_rss,
+        }
+    
+    def to_prometheus(self):
+        """Report in the Prometheus text exposition format (for a textfile collector)"""
+        report = self.report()
+        lines = [
+            '# HELP qrgen_wall_seconds Wall time since the run started.',
+            '# TYPE qrgen_wall_seconds gauge',
+            f"qrgen_wall_seconds {report['wall_seconds']:.6f}",
+            '# HELP qrgen_stage_seconds_total Wall time spent in each pipeline stage.',
+            '# TYPE qrgen_stage_seconds_total counter',
+        ]
+        lines += [f'qrgen_stage_seconds_total{{stage="{stage}"}} {entry["seconds"]:.6f}'
+                  for stage, entry in report['stages'].items()]
+        lines += ['# HELP qrgen_stage_calls_total Calls of each pipeline stage.',
+                  '# TYPE qrgen_stage_calls_total counter']
+        lines += [f'qrgen_stage_calls_total{{stage="{stage}"}} {entry["calls"]}'
+                  for stage, entry in report['stages'].items()]
+        lines += ['# HELP qrgen_stage_max_seconds Slowest single call of each pipeline stage.',
+                  '# TYPE qrgen_stage_max_seconds gauge']
+        lines += [f'qrgen_stage_max_seconds{{stage="{stage}"}} {entry["max_seconds"]:.6f}'
+                  for stage, entry in report['stages'].items()]
+        lines += ['# HELP qrgen_codes_total Codes generated per QR version.',
+                  '# TYPE qrgen_codes_total counter']
+        lines += [f'qrgen_codes_total{{version="{version}"}} {count}'
+                  for version, count in report['versions'].items()]
+        lines += ['# HELP qrgen_events_total Pipeline events such as cache hits.',
+                  '# TYPE qrgen_events_total counter']
+        lines += [f'qrgen_events_total{{event="{event}"}} {count}'
+                  for event, count in report['events'].items()]
+        for name, value in (('peak_rss_bytes', report['peak_rss_bytes']),
+                            ('peak_children_rss_bytes', report['peak_children_rss_bytes'])):
+            if value is not None:
+                lines += [f'# TYPE qrgen_{name} gauge', f'qrgen_{name} {value}']
+        return '\n'.join(lines) + '\n'
+    
+    def write(self, path, format_type=None):
+        """Write the report to path ('-' for stdout) as 'json' or 'prometheus'.
+
+        Files are replaced atomically, as textfile collectors expect.
+        """
+        if format_type is None:
+            format_type = 'prometheus' if str(path).endswith('.prom') else 'json'
+        if format_type == 'prometheus':
+            content = self.to_prometheus()
+        else:
+            import json
+            content = json.dumps(self.report(), indent=2) + '\n'
+        if path == '-':
+            sys.stdout.write(content)
+            return
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(content, encoding='utf-8')
+        os.replace(temp_path, path)
+
+class QRGenerator:
+    def __init__(self, logo_cache_size=32, mask_cache_size=16, stats=None, executor=None,
+                 max_concurrency=None):
+        self.supported_formats = ['PNG', 'JPEG', 'BMP', 'TIFF', 'SVG', 'TERM', 'MATRIX']
+        # Optional StageStats collecting per-stage timings
+        self.stats = stats
+        # Prepared logo tiles, least recently used first
+        self.logo_cache_size = logo_cache_size
+        self._logo_cache = collections.OrderedDict()
+        # Rounded-corner masks by image size and radius, least recently used first
+        self.mask_cache_size = mask_cache_size
+        self._mask_cache = collections.OrderedDict()
+        # Guards both caches, as the async API may run several calls in threads
+        self._cache_lock = threading.Lock()
+        # Async API: executor for the CPU work (a private thread pool when
+        # None) and the number of calls allowed to run at once. Rendering
+        # holds the GIL, so extra threads add event loop latency but no
+        # throughput; a process pool can use a slot per CPU.
+        if max_concurrency is None:
+            max_concurrency = 1 if executor is None else os.cpu_count() or 1
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self._own_executor = None
+        self._async_slots = None
+    
+    def _stage(self, stage):
+        """Time a pipeline stage when stats are enabled"""
+        if self.stats is None:
+            return contextlib.nullcontext()
+        return self.stats.time(stage)
+    
+    def generate_qr(self, text, **kwargs):
+        """Generate QR code with specified parameters"""
+        qr, error = self.encode_qr(text, **kwargs)
+        if error:
+            return None, error
+        return self.draw_qr(qr, **kwargs)
+    
+    def encode_matrix(self, text, **kwargs):
+        """Encode text to a PackedMatrix without drawing it, returns (matrix, error)"""
+        qr, error = self.encode_qr(text, **kwargs)
+        if error:
+            return None, error
+        return PackedMatrix.from_modules(qr.matrix if isinstance(qr, NumpyQRCode) else qr.modules), None
+    
+    def encode_qr(self, text, **kwargs):
+        """Compute the module matrix for text, returns (qr, error).
+
+        The result can be drawn any number of times with draw_qr.
+        """
+        try:
+            error_correction = self.get_error_correction(kwargs.get('error_correction', 'M'))
+            # engine='qrcode' keeps qrcode's own fitting, encoding and drawing;
+            # otherwise use capacity-table fitting with optimal segments and,
+            # when NumPy is installed and worth loading (see use_numpy), the
+            # NumPy encode/render engine
+            stock = kwargs.get('engine', 'auto') == 'qrcode'
+            fast = False
+            with self._stage('encode'):
+                if stock:
+                    version = kwargs.get('version', 1)
+                else:
+                    version, segments = fit_version(text, error_correction, kwargs.get('version'))
+                    fast = use_numpy(version)
+                # QR Code configuration
+                qr = (NumpyQRCode if fast else qrcode.QRCode)(
+                    version=version,
+                    error_correction=error_correction,
+                    box_size=kwargs.get('box_size', 10),
+                    border=kwargs.get('border', 4),
+                )
+                if stock:
+                    qr.add_data(text)
+                    qr.make(fit=True)
+                else:
+                    for segment in segments:
+                        qr.add_data(segment)
+                    qr.make(fit=False)
+            if self.stats is not None:
+                self.stats.record_version(qr.version)
+            return qr, None
+        except Exception as e:
+            return None, str(e)
+    
+    def draw_qr(self, qr, **kwargs):
+        """Draw an encoded QR code from encode_qr, returns (img, error).
+
+        Takes the generate_qr drawing arguments. Raster codes always come back
+        as a RenderedImage.
+        """
+        try:
+            format_type = kwargs.get('format_type', 'PNG').upper()
+            stock = kwargs.get('engine', 'auto') == 'qrcode'
+            fast = isinstance(qr, NumpyQRCode)
+            # qrcode's make_image draws at the code's own sizes
+            qr.box_size = kwargs.get('box_size', 10)
+            qr.border = kwargs.get('border', 4)
+            with self._stage('render'):
+                fill_color = kwargs.get('fill_color', 'black')
+                back_color = kwargs.get('back_color', 'white')
+                if format_type in TEXT_FORMATS:
+                    img = TextQRImage(PackedMatrix.from_modules(qr.matrix if fast else qr.modules),
+                                      qr.border, format_type, kwargs.get('invert', False))
+                elif format_type == 'SVG' and stock:
+                    from qrcode.image.svg import SvgImage
+                    img = qr.make_image(image_factory=SvgImage)
+                elif format_type == 'SVG':
+                    img = SvgPathImage(qr.matrix if fast else qr.modules, qr.box_size, qr.border,
+                                       fill_color, back_color)
+                else:
+                    img = None
+                    # Rasterize the module matrix with NumPy when possible, falling
+                    # back to qrcode's per-module drawing otherwise
+                    compact = kwargs.get('compact', False)
+                    if fast:
+                        img = render_modules(qr.matrix, qr.box_size, qr.border, fill_color, back_color,
+                                             compact=compact)
+                    if img is None:
+                        img = qr.make_image(fill_color=fill_color, back_color=back_color).get_image()
+                        if compact and img.mode == 'RGB':
+                            img = img.convert('P', palette=Image.Palette.ADAPTIVE, colors=2)
+                    img = RenderedImage(qr.border, qr.modules_count, qr.box_size, image=img)
+            return img, None
+        except Exception as e:
+            return None, str(e)
+    
+    def get_error_correction(self, level):
+        """Get error correction level"""
+        levels = {
+            'L': qrcode.constants.ERROR_CORRECT_L,  # ~7%
+            'M': qrcode.constants.ERROR_CORRECT_M,  # ~15%
+            'Q': qrcode.constants.ERROR_CORRECT_Q,  # ~25%
+            'H': qrcode.constants.ERROR_CORRECT_H   # ~30%
+        }
+        return levels.get(level.upper(), qrcode.constants.ERROR_CORRECT_M)
+    
+    def add_logo(self, qr_img, logo_path, logo_size_ratio=0.2):
+        """Add logo to the center of QR code"""
+        with self._stage('logo'):
+            try:
+                if not os.path.exists(logo_path):
+                    return qr_img, f"Logo file not found: {logo_path}"
+                
+                # Convert QR image to RGB if it's not already
+                if qr_img.mode != 'RGB':
+                    qr_img = qr_img.convert('RGB')
+                
+                # Calculate logo size
+                qr_width, qr_height = qr_img.size
+                logo_size = int(min(qr_width, qr_height) * logo_size_ratio)
+                
+                logo_bg = self.get_logo_tile(logo_path, logo_size, logo_size_ratio)
+                logo_bg_size = logo_bg.size[0]
+                
+                # Calculate position to center the logo on QR code
+                pos = ((qr_width - logo_bg_size) // 2, (qr_height - logo_bg_size) // 2)
+                
+                # Paste logo onto QR code
+                qr_img.paste(logo_bg, pos)
+                return qr_img, None
+                
+            except Exception as e:
+                return qr_img, f"Could not add logo: {e}"
+    
+    def get_logo_tile(self, logo_path, logo_size, logo_size_ratio=0.2):
+        """Get the logo resized onto its white background tile.
+
+        Tiles are cached by logo path, mtime and size; the returned tile is
+        shared and must not be modified.
+        """
+        stat = os.stat(logo_path)
+        key = (os.path.abspath(logo_path), stat.st_mtime_ns, logo_size, logo_size_ratio)
+        with self._cache_lock:
+            logo_bg = self._logo_cache.get(key)
+            if logo_bg is not None:
+                self._logo_cache.move_to_end(key)
+                return logo_bg
+        
+        with Image.open(logo_path) as logo:
+            # Resize logo maintaining aspect ratio
+            logo.thumbnail((logo_size, logo_size), Image.Resampling.LANCZOS)
+            
+            # Create a white background for the logo
+            logo_bg_size = logo_size + 20
+            logo_bg = Image.new('RGB', (logo_bg_size, logo_bg_size), 'white')
+            
+            # Center the logo on the white background
+            logo_pos = ((logo_bg_size - logo.size[0]) // 2, (logo_bg_size - logo.size[1]) // 2)
+            
+            # Handle logo transparency
+            if logo.mode == 'RGBA':
+                logo_bg.paste(logo, logo_pos, logo)
+            else:
+                logo_bg.paste(logo, logo_pos)
+        
+        with self._cache_lock:
+            self._logo_cache[key] = logo_bg
+            while len(self._logo_cache) > self.logo_cache_size:
+                self._logo_cache.popitem(last=False)
+        return logo_bg
+    
+    def create_rounded_qr(self, qr_img, corner_radius=10):
+        """Create rounded corners for QR code"""
+        with self._stage('rounded'):
+            try:
+                # Convert to RGB if needed
+                if qr_img.mode != 'RGB':
+                    qr_img = qr_img.convert('RGB')
+                
+                # Apply the mask for rounded corners
+                mask, _ = self.get_rounded_mask(qr_img.size, corner_radius)
+                output = qr_img.convert('RGBA')
+                output.putalpha(mask)
+                
+                return output, None
+                
+            except Exception as e:
+                return qr_img, f"Could not create rounded corners: {e}"
+    
+    def get_rounded_mask(self, size, corner_radius=10):
+        """Get the rounded-corner alpha mask for an image size and its inverse.
+
+        The masks are cached and shared, and must not be modified.
+        """
+        key = (tuple(size), corner_radius)
+        with self._cache_lock:
+            masks = self._mask_cache.get(key)
+            if masks is not None:
+                self._mask_cache.move_to_end(key)
+                return masks
+        
+        from PIL import ImageDraw
+        mask = Image.new('L', key[0], 0)
+        draw = ImageDraw.Draw(mask)
+        draw.rounded_rectangle([0, 0, key[0][0], key[0][1]], corner_radius, fill=255)
+        masks = (mask, mask.point(lambda value: 255 - value))
+        
+        with self._cache_lock:
+            self._mask_cache[key] = masks
+            while len(self._mask_cache) > self.mask_cache_size:
+                self._mask_cache.popitem(last=False)
+        return masks
+    
+    def decorate_qr(self, qr_img, logo_path=None, logo_size_ratio=0.2, rounded=False,
+                    corner_radius=10, flatten=False):
+        """Add the logo and rounded corners in one pass, like add_logo then create_rounded_qr.
+
+        With flatten (for JPEG) the cut corners are filled with white. An RGB
+        input image is modified in place. Returns (img, warnings).
+        """
+        warnings = []
+        if not (logo_path or rounded):
+            return qr_img, warnings
+        if not hasattr(qr_img, 'mode'):
+            kind = getattr(qr_img, 'kind', 'SVG')
+            if logo_path:
+                warnings.append(('Logo', f"Logos are not supported for {kind} output"))
+            if rounded:
+                warnings.append(('Rounded corners', f"Rounded corners are not supported for {kind} output"))
+            return qr_img, warnings
+        
+        if isinstance(qr_img, PilImage):
+            qr_img = qr_img.get_image()
+        img = qr_img if qr_img.mode == 'RGB' else qr_img.convert('RGB')
+        
+        if logo_path:
+            with self._stage('logo'):
+                if not os.path.exists(logo_path):
+                    warnings.append(('Logo', f"Logo file not found: {logo_path}"))
+                else:
+                    try:
+                        qr_width, qr_height = img.size
+                        logo_size = int(min(qr_width, qr_height) * logo_size_ratio)
+                        logo_bg = self.get_logo_tile(logo_path, logo_size, logo_size_ratio)
+                        logo_bg_size = logo_bg.size[0]
+                        img.paste(logo_bg, ((qr_width - logo_bg_size) // 2, (qr_height - logo_bg_size) // 2))
+                    except Exception as e:
+                        warnings.append(('Logo', f"Could not add logo: {e}"))
+        
+        if rounded:
+            with self._stage('rounded'):
+                try:
+                    mask, inverse = self.get_rounded_mask(img.size, corner_radius)
+                    if flatten:
+                        img.paste('white', (0, 0) + img.size, inverse)
+                    else:
+                        img.putalpha(mask)
+                except Exception as e:
+                    warnings.append(('Rounded corners', f"Could not create rounded corners: {e}"))
+        
+        return img, warnings
+    
+    def save_qr(self, img, output_path, format_type='PNG', compress_level=None, optimize=False):
+        """Save QR code image to a path or a writable binary file object.
+
+        compress_level (0-9) is the zlib level for PNG; for TIFF, 0 stores raw
+        pixels and 1-9 compress. optimize searches for the smallest PNG.
+        """
+        with self._stage('save'):
+            try:
+                if hasattr(output_path, 'write'):
+                    self._encode_image(img, output_path, format_type, compress_level, optimize)
+                    return True, output_path
+                output_path = Path(output_path)
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                with atomic_output(output_path) as f:
+                    self._encode_image(img, f, format_type, compress_level, optimize)
+                return True, str(output_path)
+            except Exception as e:
+                return False, str(e)
+    
+    def _encode_image(self, img, stream, format_type, compress_level=None, optimize=False):
+        """Encode an image in an output format to a binary stream (see save_qr)"""
+        format_type = format_type.upper()
+        if format_type == 'SVG' or format_type in TEXT_FORMATS:
+            # Let SVG and text images serialize themselves straight to the target
+            img.save(stream)
+            return
+        if isinstance(img, PilImage):
+            img = img.get_image()
+        if format_type == 'JPEG' and img.mode in ('RGBA', 'LA'):
+            background = Image.new('RGB', img.size, 'white')
+            if img.mode == 'RGBA':
+                background.paste(img, mask=img.split()[-1])
+            else:
+                background.paste(img)
+            img = background
+        elif format_type == 'JPEG' and img.mode == 'P':
+            img = img.convert('RGB')
+        
+        params = {}
+        if format_type == 'PNG':
+            if compress_level is not None:
+                params['compress_level'] = compress_level
+            if optimize:
+                params['optimize'] = True
+        elif format_type == 'TIFF' and compress_level:
+            params['compression'] = 'group4' if img.mode == '1' else 'tiff_adobe_deflate'
+        # Given a format, Pillow first imports all of its common plugins; given
+        # a file name it imports just the one for the extension
+        name = getattr(stream, 'name', None)
+        if isinstance(name, str) and name.lower().endswith(FORMAT_SUFFIXES.get(format_type, '\0')):
+            format_type = None
+        img.save(stream, format_type, **params)
+    
+    def to_bytes(self, img, format_type='PNG', compress_level=None, optimize=False):
+        """Encode QR code image in memory, returns (data, error)"""
+        buffer = io.BytesIO()
+        success, result = self.save_qr(img, buffer, format_type, compress_level, optimize)
+        if not success:
+            return None, result
+        return buffer.getvalue(), None
+    
+    def render_qr(self, text, logo=None, logo_size=0.2, rounded=False, compress_level=None,
+                  optimize=False, **kwargs):
+        """Generate, decorate and encode a QR code in memory, returns (data, error).
+
+        A logo or rounded corners that cannot be applied do not fail it.
+        """
+        img, error = self.generate_qr(text, **kwargs)
+        if error:
+            return None, error
+        format_type = kwargs.get('format_type', 'PNG').upper()
+        if format_type != 'SVG':
+            img, _ = self.decorate_qr(img, logo, logo_size, rounded, flatten=format_type == 'JPEG')
+        return self.to_bytes(img, format_type, compress_level, optimize)
+    
+    def render_renditions(self, text, renditions, **kwargs):
+        """Encode text once and render it in several forms in memory.
+
+        renditions are dicts of render_qr arguments overriding kwargs; the
+        encoding arguments come from kwargs only. Returns (results, error),
+        with a (data, error, warnings) triple per rendition.
+        """
+        qr, error = self.encode_qr(text, **kwargs)
+        if error:
+            return None, error
+        drawn = {}
+        results = []
+        for rendition in renditions:
+            options = dict(kwargs, **rendition)
+            format_type = options.get('format_type', 'PNG').upper()
+            key = (format_type if format_type == 'SVG' or format_type in TEXT_FORMATS else None,
+                   options.get('box_size', 10), options.get('border', 4),
+                   options.get('fill_color', 'black'), options.get('back_color', 'white'),
+                   options.get('compact', False), options.get('invert', False))
+            if key not in drawn:
+                drawn[key] = self.draw_qr(qr, **options)
+            img, error = drawn[key]
+            if error:
+                results.append((None, error, []))
+                continue
+            # decorate_qr modifies RGB images in place
+            if getattr(img, 'mode', None) == 'RGB' and (options.get('logo') or options.get('rounded')):
+                img = img.copy()
+            img, warnings = self.decorate_qr(img, options.get('logo'), options.get('logo_size', 0.2),
+                                             options.get('rounded', False), flatten=format_type == 'JPEG')
+            data, error = self.to_bytes(img, format_type, options.get('compress_level'),
+                                        options.get('optimize', False))
+            results.append((data, error, warnings))
+        return results, None
+    
+    def render_many(self, texts, **kwargs):
+        """Lazily yield (text, data) for each text, data being None on failure"""
+        for text in texts:
+            data, _ = self.render_qr(text, **kwargs)
+            yield text, data
+    
+    async def _run_async(self, method, *args, **kwargs):
+        """Run a generator method on the executor, within the concurrency limit.
+
+        Cancelling drops a call that has not started; a running call completes
+        in the background.
+        """
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        loop = asyncio.get_running_loop()
+        # The semaphore belongs to one event loop; make a new one for another
+        if self._async_slots is None or self._async_slots[0] is not loop:
+            self._async_slots = (loop, asyncio.Semaphore(self.max_concurrency))
+        executor = self.executor
+        if executor is None:
+            if self._own_executor is None:
+                self._own_executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                        thread_name_prefix='qr-async')
+            executor = self._own_executor
+        
+        if isinstance(executor, ProcessPoolExecutor):
+            call = functools.partial(_call_worker_generator, method, args, kwargs)
+        else:
+            call = functools.partial(getattr(self, method), *args, **kwargs)
+        async with self._async_slots[1]:
+            return await loop.run_in_executor(executor, call)
+    
+    async def agenerate(self, text, **kwargs):
+        """Async generate_qr: encodes and renders on the executor. Returns (img, error)"""
+        return await self._run_async('generate_qr', text, **kwargs)
+    
+    async def asave(self, img, output_path, format_type='PNG', compress_level=None, optimize=False):
+        """Async save_qr: encodes and writes on the loop's default thread pool"""
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self.save_qr, img, output_path, format_type, compress_level, optimize))
+    
+    async def arender(self, text, **kwargs):
+        """Async render_qr: the whole render runs on the executor. Returns (data, error)"""
+        return await self._run_async('render_qr', text, **kwargs)
+    
+    async def arender_many(self, texts, **kwargs):
+        """Asynchronously yield (text, data) for each text, in input order.
+
+        texts may be an async iterable. Leaving the loop early, or cancelling
+        the consuming task, cancels the renders still waiting.
+        """
+        import asyncio
+        if not hasattr(texts, '__aiter__'):
+            texts = _aiter_sync(texts)
+        pending = collections.deque()
+        try:
+            async for text in texts:
+                pending.append((text, asyncio.ensure_future(self.arender(text, **kwargs))))
+                if len(pending) < self.max_concurrency * 2:
+                    continue
+                text, task = pending.popleft()
+                data, _ = await task
+                yield text, data
+            while pending:
+                text, task = pending.popleft()
+                data, _ = await task
+                yield text, data
+        finally:
+            for _, task in pending:
+                task.cancel()
+    
+    def close(self):
+        """Shut down the thread pool created for the async API, if any"""
+        if self._own_executor is not None:
+            self._own_executor.shutdown(wait=False, cancel_futures=True)
+            self._own_executor = None
+
+class RenderedImage(PilImage):
+    """qrcode's PIL image wrapper around an already drawn PIL image.
+
+    Unlike qrcode's own images it pickles, so worker processes can return it.
+    """
+    
+    def __init__(self, border, width, box_size, image):
+        super().__init__(border, width, box_size, qrcode_modules=None, image=image)
+    
+    def new_image(self, image=None, **kwargs):
+        return image
+    
+    def __getstate__(self):
+        return self.__dict__
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+def render_modules(modules, box_size, border, fill_color='black', back_color='white', compact=False):
+    """Rasterize a QR module matrix in one vectorized step, matching qrcode's PIL image.
+
+    With compact, colours other than black on white give a two-entry palette
+    image. Returns None for colours it does not handle (e.g. a transparent
+    background); use qrcode's renderer then.
+    """
+    if load_numpy() is None:
+        return None
+    try:
+        fill_color = fill_color.lower()
+    except AttributeError:
+        pass
+    try:
+        back_color = back_color.lower()
+    except AttributeError:
+        pass
+    
+    grid = np.pad(np.asarray(modules, dtype=bool), border)
+    pixels = grid.repeat(box_size, axis=0).repeat(box_size, axis=1)
+    
+    # Same mode selection as qrcode.image.pil.PilImage
+    if fill_color == 'black' and back_color == 'white':
+        return Image.fromarray(~pixels)
+    if back_color == 'transparent':
+        return None
+    
+    palette = []
+    for color in (back_color, fill_color):
+        if isinstance(color, str):
+            color = ImageColor.getcolor(color, 'RGB')
+        if not isinstance(color, tuple) or len(color) != 3:
+            return None
+        palette.extend(color)
+    # Reinterpret the 0/1 'L' image as a two-entry palette image (0 is the
+    # background, 1 the fill), then expand it to RGB in a single pass in C
+    img = Image.fromarray(pixels.view(np.uint8))
+    img.putpalette(palette)
+    return img if compact else img.convert('RGB')
+
+class SvgPathImage:
+    """Standalone SVG QR code drawn as a single path, written as a stream.
+
+    Sizes follow qrcode's SVG images (a box size of 10 is 1mm per module).
+    """
+    
+    kind = 'SVG'
+    
+    # Module rows formatted per write to the output stream
+    rows_per_write = 64
+    
+    def __init__(self, modules, box_size, border, fill_color='black', back_color='white'):
+        self.modules = modules
+        self.box_size = box_size
+        self.border = border
+        self.fill_color = fill_color
+        self.back_color = back_color
+    
+    @staticmethod
+    def _color(color):
+        """Format a colour name, hex string or RGB tuple as an escaped SVG attribute"""
+        if isinstance(color, (tuple, list)):
+            color = f"rgb({','.join(str(int(c)) for c in color[:3])})"
+        import xml.sax.saxutils
+        return xml.sax.saxutils.escape(str(color), {'"': '&quot;'})
+    
+    @staticmethod
+    def _units(modules, box_size):
+        """Physical size of a number of modules, with qrcode's mm formatting"""
+        import decimal
+        units = decimal.Decimal(modules * box_size) / 10
+        units = units.quantize(decimal.Decimal('0.001')).normalize()
+        return f"{units:f}mm"
+    
+    def _row_path(self, y, row):
+        """Path commands for the dark runs of one module row"""
+        commands = []
+        x = self.border
+        y += self.border
+        for dark, run in itertools.groupby(row):
+            length = sum(1 for _ in run)
+            if dark:
+                commands.append(f"M{x},{y}h{length}v1h-{length}z")
+            x += length
+        return ''.join(commands)
+    
+    def iter_chunks(self):
+        """Yield the encoded SVG document in blocks"""
+        rows = self.modules.tolist() if hasattr(self.modules, 'tolist') else self.modules
+        width = len(rows) + 2 * self.border
+        size = self._units(width, self.box_size)
+        head = ("<?xml version='1.0' encoding='UTF-8'?>\n"
+                f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{size}" height="{size}" '
+                f'viewBox="0 0 {width} {width}" shape-rendering="crispEdges">')
+        if self.back_color not in (None, 'transparent'):
+            head += f'<rect width="100%" height="100%" fill="{self._color(self.back_color)}"/>'
+        yield (head + f'<path fill="{self._color(self.fill_color)}" d="').encode('utf-8')
+        
+        for start in range(0, len(rows), self.rows_per_write):
+            block = rows[start:start + self.rows_per_write]
+            yield ''.join(self._row_path(start + y, row) for y, row in enumerate(block)).encode('ascii')
+        yield b'"/></svg>\n'
+    
+    def save(self, stream, format=None):
+        """Write the SVG document to a binary stream or a path"""
+        if not hasattr(stream, 'write'):
+            with open(stream, 'wb') as f:
+                return self.save(f)
+        for chunk in self.iter_chunks():
+            stream.write(chunk)
+    
+    def to_string(self, **kwargs):
+        """Return the whole SVG document as bytes"""
+        return b''.join(self.iter_chunks())
+
+class PackedMatrix(collections.namedtuple('PackedMatrix', 'size data')):
+    """QR module matrix with one bit per module, rows packed into bytes.
+
+    Rows take (size + 7) // 8 bytes, most significant bit first, 1 for dark.
+    """
+    
+    __slots__ = ()
+    
+    @classmethod
+    def from_modules(cls, modules):
+        """Pack a square matrix of booleans (nested lists or a NumPy array)"""
+        if np is not None and isinstance(modules, np.ndarray):
+            return cls(modules.shape[0], np.packbits(modules, axis=1).tobytes())
+        size = len(modules)
+        row_bytes = (size + 7) // 8
+        padding = row_bytes * 8 - size
+        data = bytearray()
+        for row in modules:
+            value = 0
+            for dark in row:
+                value = value << 1 | bool(dark)
+            data += (value << padding).to_bytes(row_bytes, 'big')
+        return cls(size, bytes(data))
+    
+    @property
+    def row_bytes(self):
+        """Bytes per packed row"""
+        return (self.size + 7) // 8
+    
+    def row(self, index):
+        """One row of modules as a list of booleans"""
+        start = index * self.row_bytes
+        value = int.from_bytes(self.data[start:start + self.row_bytes], 'big')
+        shift = self.row_bytes * 8 - 1
+        return [bool(value >> (shift - col) & 1) for col in range(self.size)]
+    
+    def unpack(self):
+        """All modules as nested lists of booleans, like QRCode.modules"""
+        return [self.row(index) for index in range(self.size)]
+
+# Formats written as text from the packed matrix
+TEXT_FORMATS = ('TERM', 'MATRIX')
+
+class TextQRImage:
+    """QR code drawn as text: Unicode half-blocks (TERM) or rows of 0/1 (MATRIX).
+
+    TERM draws dark modules as ink unless invert is set (for dark terminals).
+    """
+    
+    # Characters for (top, bottom) ink, indexed top + 2 * bottom
+    half_blocks = ' \u2580\u2584\u2588'
+    
+    def __init__(self, matrix, border, kind='TERM', invert=False):
+        self.matrix = matrix
+        self.border = border
+        self.kind = kind
+        self.invert = invert
+    
+    def iter_lines(self):
+        """Yield the text lines, without line endings"""
+        width = self.matrix.size + 2 * self.border
+        light = [False] * width
+        rows = itertools.chain(
+            [light] * self.border,
+            ([False] * self.border + self.matrix.row(index) + [False] * self.border
+             for index in range(self.matrix.size)),
+            [light] * self.border)
+        if self.kind == 'MATRIX':
+            for row in rows:
+                yield ''.join('1' if dark else '0' for dark in row)
+            return
+        ink = self.invert
+        for top in rows:
+            bottom = next(rows, light)
+            yield ''.join(self.half_blocks[(a != ink) + 2 * (b != ink)] for a, b in zip(top, bottom))
+    
+    def save(self, stream, format=None):
+        """Write the text, UTF-8 encoded, to a binary stream or a path"""
+        if not hasattr(stream, 'write'):
+            with open(stream, 'wb') as f:
+                return self.save(f)
+        stream.write(''.join(line + '\n' for line in self.iter_lines()).encode('utf-8'))
+    
+    def to_string(self, **kwargs):
+        """Return the whole text as bytes"""
+        buffer = io.BytesIO()
+        self.save(buffer)
+        return buffer.getvalue()
+
+# Versions sharing the same character count field widths
+VERSION_CLASSES = ((1, 9), (10, 26), (27, 40))
+
+_SEGMENT_MODES = (qrcode.util.MODE_8BIT_BYTE, qrcode.util.MODE_ALPHA_NUM, qrcode.util.MODE_NUMBER)
+_ALPHA_NUM_CHARS = frozenset(qrcode.util.ALPHA_NUM.decode('ascii'))
+
+def segment_text(text, version=1):
+    """Split text into the QR segments needing the fewest bits at a version.
+
+    Costs are in sixths of a bit so numeric and alphanumeric runs compare
+    exactly. Returns a list of qrcode.util.QRData segments.
+    """
+    if not text:
+        return [qrcode.util.QRData(b'', mode=qrcode.util.MODE_8BIT_BYTE)]
+    
+    count_bits = qrcode.util.mode_sizes_for_version(version)
+    head_costs = [(4 + count_bits[mode]) * 6 for mode in _SEGMENT_MODES]
+    prev_costs = list(head_costs)
+    # char_modes[i][m]: mode of char i when the segment ending at i is in mode m
+    char_modes = []
+    
+    for char in text:
+        cur_costs = [None, None, None]
+        modes = [None, None, None]
+        cur_costs[0] = prev_costs[0] + len(char.encode('utf-8')) * 8 * 6
+        modes[0] = 0
+        if char in _ALPHA_NUM_CHARS:
+            cur_costs[1] = prev_costs[1] + 33
+            modes[1] = 1
+            if char.isdigit():
+                cur_costs[2] = prev_costs[2] + 20
+                modes[2] = 2
+        
+        # Switching modes after this char costs the whole-bit rounding of the
+        # current segment plus the next segment header
+        for to_mode in range(3):
+            for from_mode in range(3):
+                if modes[from_mode] is None:
+                    continue
+                new_cost = (cur_costs[from_mode] + 5) // 6 * 6 + head_costs[to_mode]
+                if modes[to_mode] is None or new_cost < cur_costs[to_mode]:
+                    cur_costs[to_mode] = new_cost
+                    modes[to_mode] = from_mode
+        char_modes.append(modes)
+        prev_costs = cur_costs
+    
+    mode = min(range(3), key=lambda m: prev_costs[m])
+    chosen = [0] * len(text)
+    for i in range(len(text) - 1, -1, -1):
+        mode = char_modes[i][mode]
+        chosen[i] = mode
+    
+    segments = []
+    start = 0
+    for i in range(1, len(text) + 1):
+        if i == len(text) or chosen[i] != chosen[start]:
+            segments.append(qrcode.util.QRData(
+                text[start:i].encode('utf-8'), mode=_SEGMENT_MODES[chosen[start]]))
+            start = i
+    return segments
+
+def segments_bit_length(segments, version):
+    """Exact number of data bits the segments need at a version"""
+    count_bits = qrcode.util.mode_sizes_for_version(version)
+    total = 0
+    for segment in segments:
+        length = len(segment)
+        total += 4 + count_bits[segment.mode]
+        if segment.mode == qrcode.util.MODE_NUMBER:
+            total += 10 * (length // 3) + (0, 4, 7)[length % 3]
+        elif segment.mode == qrcode.util.MODE_ALPHA_NUM:
+            total += 11 * (length // 2) + 6 * (length % 2)
+        else:
+            total += 8 * length
+    return total
+
+def fit_version(text, error_correction, min_version=None):
+    """Pick the smallest version that holds text, with its optimal segments.
+
+    error_correction is a qrcode ERROR_CORRECT_* constant.
+    Returns (version, segments).
+    """
+    import bisect
+    capacities = qrcode.util.BIT_LIMIT_TABLE[error_correction]
+    min_version = min_version or 1
+    for first, last in VERSION_CLASSES:
+        if last < min_version:
+            continue
+        segments = segment_text(text, first)
+        needed_bits = segments_bit_length(segments, first)
+        version = bisect.bisect_left(capacities, needed_bits, max(first, min_version), last + 1)
+        if version <= last:
+            return version, segments
+    raise qrcode.exceptions.DataOverflowError(
+        "Data too long to fit in a QR code at this error correction level")
+
+@functools.lru_cache(maxsize=None)
+def mask_patterns(modules_count):
+    """Boolean stack of the 8 QR mask patterns for a symbol size, shape (8, n, n)"""
+    i, j = np.indices((modules_count, modules_count))
+    masks = np.stack([
+        (i + j) % 2 == 0,
+        i % 2 == 0,
+        j % 3 == 0,
+        (i + j) % 3 == 0,
+        (i // 2 + j // 3) % 2 == 0,
+        (i * j) % 2 + (i * j) % 3 == 0,
+        ((i * j) % 2 + (i * j) % 3) % 2 == 0,
+        ((i * j) % 3 + (i + j) % 2) % 2 == 0,
+    ])
+    masks.flags.writeable = False
+    return masks
+
+# Dark/light sequences scored by penalty rule 3, as in qrcode.util
+_FINDER_LIKE_PATTERNS = (
+    (1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0),
+    (0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1),
+)
+
+def _run_penalty(candidates):
+    """Penalty rule 1 along the last axis: each run of 5+ same-colour modules scores length - 2"""
+    count, n = candidates.shape[0], candidates.shape[-1]
+    starts = np.ones(candidates.shape, dtype=bool)
+    starts[..., 1:] = candidates[..., 1:] != candidates[..., :-1]
+    starts = starts.ravel()
+    lengths = np.diff(np.append(np.flatnonzero(starts), starts.size))
+    owners = np.flatnonzero(starts) // (n * n)
+    weights = np.where(lengths >= 5, lengths - 2, 0)
+    return np.bincount(owners, weights=weights, minlength=count)
+
+def _finder_penalty(candidates):
+    """Penalty rule 3 along the last axis: 40 per finder-like 1:1:3:1:1 sequence"""
+    n = candidates.shape[-1]
+    width = n - 10
+    if width <= 0:
+        return np.zeros(candidates.shape[0])
+    total = np.zeros(candidates.shape[0])
+    for pattern in _FINDER_LIKE_PATTERNS:
+        match = np.ones(candidates.shape[:-1] + (width,), dtype=bool)
+        for offset, dark in enumerate(pattern):
+            window = candidates[..., offset:offset + width]
+            match &= window if dark else ~window
+        total += 40 * match.sum(axis=(1, 2))
+    return total
+
+def mask_penalties(candidates):
+    """Score a stack of module matrices, shape (k, n, n), like qrcode.util.lost_point"""
+    n = candidates.shape[-1]
+    columns = candidates.transpose(0, 2, 1)
+    
+    penalty = _run_penalty(candidates) + _run_penalty(columns)
+    
+    # Rule 2: 3 points per 2x2 block of one colour
+    top_left = candidates[:, :-1, :-1]
+    blocks = ((top_left == candidates[:, :-1, 1:]) & (top_left == candidates[:, 1:, :-1])
+              & (top_left == candidates[:, 1:, 1:]))
+    penalty += 3 * blocks.sum(axis=(1, 2))
+    
+    penalty += _finder_penalty(candidates) + _finder_penalty(columns)
+    
+    # Rule 4: 10 points per 5% the dark ratio departs from 50%, computed
+    # exactly as qrcode does to keep float rounding identical
+    for k, dark_count in enumerate(candidates.sum(axis=(1, 2)).tolist()):
+        percent = float(dark_count) / (n ** 2)
+        penalty[k] += int(abs(percent * 100 - 50) / 5) * 10
+    return penalty.astype(np.int64)
+
+VersionTemplate = collections.namedtuple(
+    'VersionTemplate', 'base reserved data_rows data_cols format_rows format_cols version_rows version_cols')
+
+@functools.lru_cache(maxsize=None)
+def version_template(version):
+    """Precomputed layout shared by every symbol of a QR version.
+
+    The format_* and version_* coordinates are in qrcode's bit order. All
+    arrays are read-only.
+    """
+    # Let qrcode place its function patterns so the template matches it exactly
+    qr = qrcode.QRCode(version=version)
+    n = qr.modules_count = version * 4 + 17
+    qr.modules = [[None] * n for _ in range(n)]
+    qr.setup_position_probe_pattern(0, 0)
+    qr.setup_position_probe_pattern(n - 7, 0)
+    qr.setup_position_probe_pattern(0, n - 7)
+    qr.setup_position_adjust_pattern()
+    qr.setup_timing_pattern()
+    qr.setup_type_info(True, 0)
+    if version >= 7:
+        qr.setup_type_number(True)
+    
+    reserved = np.array([[module is not None for module in row] for row in qr.modules])
+    base = np.array([[bool(module) for module in row] for row in qr.modules])
+    
+    # Walk the data area the way qrcode.QRCode.map_data does
+    data_rows, data_cols = [], []
+    row, inc = n - 1, -1
+    for col in range(n - 1, 0, -2):
+        if col <= 6:
+            col -= 1
+        while True:
+            for c in (col, col - 1):
+                if not reserved[row, c]:
+                    data_rows.append(row)
+                    data_cols.append(c)
+            row += inc
+            if row < 0 or row >= n:
+                row -= inc
+                inc = -inc
+                break
+    
+    # Format information, bit i (vertical copy then horizontal copy)
+    format_rows = [i if i < 6 else i + 1 if i < 8 else n - 15 + i for i in range(15)]
+    format_cols = [8] * 15
+    format_rows += [8] * 15
+    format_cols += [n - i - 1 if i < 8 else 15 - i if i < 9 else 15 - i - 1 for i in range(15)]
+    # Version information, bit i (both copies)
+    version_rows = [i // 3 for i in range(18)] + [i % 3 + n - 11 for i in range(18)]
+    version_cols = [i % 3 + n - 11 for i in range(18)] + [i // 3 for i in range(18)]
+    
+    arrays = [base, reserved] + [np.array(a, dtype=np.intp) for a in (
+        data_rows, data_cols, format_rows, format_cols, version_rows, version_cols)]
+    for array in arrays:
+        array.flags.writeable = False
+    return VersionTemplate(*arrays)
+
+class NumpyQRCode(qrcode.QRCode):
+    """QRCode laid out from cached version templates with NumPy.
+
+    Gives the same modules and mask as qrcode; the final matrix is also kept as
+    an array in `matrix`.
+    """
+    
+    matrix = None
+    
+    def _unmasked(self):
+        """Template with the data bits placed, before masking and format info"""
+        if self.data_cache is None:
+            self.data_cache = qrcode.util.create_data(
+                self.version, self.error_correction, self.data_list)
+        cached = getattr(self, '_unmasked_cache', None)
+        if cached is not None and cached[0] is self.data_cache:
+            return cached[1]
+        
+        template = version_template(self.version)
+        bits = np.unpackbits(np.asarray(self.data_cache, dtype=np.uint8))
+        # Modules left over after the data bits (remainder bits) stay light
+        placed = np.zeros(len(template.data_rows), dtype=bool)
+        placed[:min(bits.size, placed.size)] = bits[:placed.size]
+        unmasked = template.base.copy()
+        unmasked[template.data_rows, template.data_cols] = placed
+        self._unmasked_cache = (self.data_cache, unmasked)
+        return unmasked
+    
+    def makeImpl(self, test, mask_pattern):
+        template = version_template(self.version)
+        self.modules_count = template.base.shape[0]
+        matrix = self._unmasked() ^ (mask_patterns(self.modules_count)[mask_pattern] & ~template.reserved)
+        
+        if not test:
+            bits = qrcode.util.BCH_type_info((self.error_correction << 3) | mask_pattern)
+            matrix[template.format_rows, template.format_cols] = np.tile(
+                (bits >> np.arange(15)) & 1, 2).astype(bool)
+            # Fixed dark module next to the lower left finder
+            matrix[self.modules_count - 8, 8] = True
+            if self.version >= 7:
+                bits = qrcode.util.BCH_type_number(self.version)
+                matrix[template.version_rows, template.version_cols] = np.tile(
+                    (bits >> np.arange(18)) & 1, 2).astype(bool)
+        
+        self.matrix = matrix
+        self.modules = matrix.tolist()
+    
+    def best_mask_pattern(self):
+        template = version_template(self.version)
+        masks = mask_patterns(template.base.shape[0])
+        # Format and version areas are light for every candidate, as in
+        # qrcode's test layout
+        candidates = self._unmasked() ^ (masks & ~template.reserved)
+        return int(np.argmin(mask_penalties(candidates)))
+
+def print_banner():
+    """Print application banner"""
+    banner = f"""
+{Fore.CYAN}╔══════════════════════════════════════╗
+║           QR Code Generator          ║
+║        Command Line Interface       ║
+╚══════════════════════════════════════╝{Style.RESET_ALL}
+"""
+    print(banner)
+
+def print_success(message):
+    """Print success message"""
+    print(f"{Fore.GREEN}✓ {message}{Style.RESET_ALL}")
+
+def print_error(message):
+    """Print error message to stderr, keeping stdout for output data"""
+    print(f"{Fore.RED}✗ {message}{Style.RESET_ALL}", file=sys.stderr)
+
+def print_info(message):
+    """Print info message"""
+    print(f"{Fore.BLUE}ℹ {message}{Style.RESET_ALL}")
+
+def print_warning(message):
+    """Print warning message to stderr, keeping stdout for output data"""
+    print(f"{Fore.YELLOW}⚠ {message}{Style.RESET_ALL}", file=sys.stderr)
+
+def validate_color(color):
+    """Validate color input"""
+    try:
+        # Try to create a PIL color - this validates the color
+        Image.new('RGB', (1, 1), color)
+        return True
+    except:
+        # Try common color names and hex formats
+        valid_colors = ['black', 'white', 'red', 'green', 'blue', 'yellow', 
+                       'cyan', 'magenta', 'orange', 'purple', 'pink', 'brown', 'gray']
+        if color.lower() in valid_colors:
+            return True
+        # Check hex format
+        if color.startswith('#') and len(color) in [4, 7]:
+            try:
+                int(color[1:], 16)
+                return True
+            except:
+                pass
+        return False
+
+def get_text_input():
+    """Get text input from user with validation"""
+    while True:
+        text = input(f"{Fore.YELLOW}Enter text to encode: {Style.RESET_ALL}").strip()
+        if text:
+            return text
+        print_error("Text cannot be empty!")
+
+def get_filename_input(default="qrcode.png"):
+    """Get output filename with validation"""
+    while True:
+        filename = input(f"{Fore.YELLOW}Output filename [{default}]: {Style.RESET_ALL}").strip()
+        if not filename:
+            return default
+        
+        # Validate filename
+        try:
+            Path(filename).parent.mkdir(parents=True, exist_ok=True)
+            return filename
+        except:
+            print_error("Invalid filename or path!")
+
+def interactive_mode():
+    """Interactive mode for QR code generation"""
+    print_banner()
+    print_info("Interactive Mode - Follow the prompts to generate your QR code")
+    print()
+    
+    # Get text input
+    text = get_text_input()
+    
+    # Get output filename
+    output = get_filename_input()
+    
+    # Get customization options
+    print(f"\n{Fore.CYAN}Customization Options (press Enter for defaults):{Style.RESET_ALL}")
+    
+    # Box size
+    while True:
+        size_input = input(f"{Fore.YELLOW}Box size (1-50) [10]: {Style.RESET_ALL}").strip()
+        if not size_input:
+            size = 10
+            break
+        try:
+            size = int(size_input)
+            if 1 <= size <= 50:
+                break
+            else:
+                print_error("Box size must be between 1 and 50")
+        except ValueError:
+            print_error("Please enter a valid number")
+    
+    # Border size
+    while True:
+        border_input = input(f"{Fore.YELLOW}Border size (0-20) [4]: {Style.RESET_ALL}").strip()
+        if not border_input:
+            border = 4
+            break
+        try:
+            border = int(border_input)
+            if 0 <= border <= 20:
+                break
+            else:
+                print_error("Border size must be between 0 and 20")
+        except ValueError:
+            print_error("Please enter a valid number")
+    
+    # Colors with validation
+    while True:
+        fill_color = input(f"{Fore.YELLOW}Fill color [black]: {Style.RESET_ALL}").strip()
+        if not fill_color:
+            fill_color = 'black'
+            break
+        if validate_color(fill_color):
+            break
+        print_error("Invalid color! Use color names (red, blue, etc.) or hex (#FF0000)")
+    
+    while True:
+        back_color = input(f"{Fore.YELLOW}Background color [white]: {Style.RESET_ALL}").strip()
+        if not back_color:
+            back_color = 'white'
+            break
+        if validate_color(back_color):
+            break
+        print_error("Invalid color! Use color names (red, blue, etc.) or hex (#FF0000)")
+    
+    # Error correction
+    while True:
+        error_correction = input(f"{Fore.YELLOW}Error correction (L/M/Q/H) [M]: {Style.RESET_ALL}").strip().upper()
+        if not error_correction:
+            error_correction = 'M'
+            break
+        if error_correction in ['L', 'M', 'Q', 'H']:
+            break
+        print_error("Please enter L, M, Q, or H")
+    
+    # Logo option
+    logo_path = None
+    add_logo = input(f"{Fore.YELLOW}Add logo? (y/n) [n]: {Style.RESET_ALL}").strip().lower()
+    if add_logo in ['y', 'yes']:
+        while True:
+            logo_input = input(f"{Fore.YELLOW}Logo file path: {Style.RESET_ALL}").strip()
+            if os.path.exists(logo_input):
+                logo_path = logo_input
+                break
+            elif not logo_input:
+                print_info("Skipping logo...")
+                break
+            else:
+                print_error("File not found! Please enter a valid path.")
+    
+    # Rounded corners
+    rounded = input(f"{Fore.YELLOW}Add rounded corners? (y/n) [n]: {Style.RESET_ALL}").strip().lower()
+    add_rounded = rounded in ['y', 'yes']
+    
+    # Output format
+    while True:
+        format_input = input(f"{Fore.YELLOW}Output format (PNG/JPEG/BMP/TIFF/SVG) [PNG]: {Style.RESET_ALL}").strip().upper()
+        if not format_input:
+            format_type = 'PNG'
+            break
+        if format_input in ['PNG', 'JPEG', 'BMP', 'TIFF', 'SVG']:
+            format_type = format_input
+            break
+        print_error("Invalid format! Choose from PNG, JPEG, BMP, TIFF, SVG.")
+    
+    # Generate QR code
+    generator = QRGenerator()
+    
+    try:
+        print_info("Generating QR code...")
+        img, error = generator.generate_qr(
+            text,
+            box_size=size,
+            border=border,
+            fill_color=fill_color,
+            back_color=back_color,
+            error_correction=error_correction,
+            format_type=format_type
+        )
+        
+        if error:
+            print_error(f"Error generating QR code: {error}")
+            return
+        
+        # Add logo if specified (not supported for SVG)
+        if logo_path and format_type != 'SVG':
+            print_info("Adding logo...")
+            img, logo_error = generator.add_logo(img, logo_path)
+            if logo_error:
+                print_warning(logo_error)
+        elif logo_path and format_type == 'SVG':
+            print_warning("Logos are not supported for SVG output. Skipping logo.")
+        
+        # Add rounded corners if requested (not supported for SVG)
+        if add_rounded and format_type != 'SVG':
+            print_info("Adding rounded corners...")
+            img, round_error = generator.create_rounded_qr(img)
+            if round_error:
+                print_warning(round_error)
+        elif add_rounded and format_type == 'SVG':
+            print_warning("Rounded corners are not supported for SVG output. Skipping.")
+        
+        # Save QR code
+        success, result = generator.save_qr(img, output, format_type)
+        
+        if success:
+            print_success(f"QR code saved as: {result}")
+            print_info(f"QR code contains: {text}")
+            if format_type != 'SVG':
+                print_info(f"Size: {img.size[0]}x{img.size[1]} pixels")
+            
+            # Display QR info
+            error_levels = {'L': '~7%', 'M': '~15%', 'Q': '~25%', 'H': '~30%'}
+            print_info(f"Error correction: {error_correction} ({error_levels[error_correction]})")
+        else:
+            print_error(f"Failed to save QR code: {result}")
+            
+    except Exception as e:
+        print_error(f"Unexpected error: {e}")
+
+def batch_output_name(output, index):
+    """Build the deterministic output filename for a batch line"""
+    output = Path(output)
+    return f"{output.stem}_{index}{output.suffix}"
+
+# Bump whenever a change alters the output produced for the same inputs,
+# so stale cache entries are no longer hit
+RESULT_CACHE_VERSION = 1
+
+# Options that determine the bytes of an output file
+RESULT_CACHE_FIELDS = ('version', 'error_correction', 'box_size', 'border', 'fill_color',
+                       'back_color', 'logo_size', 'rounded', 'format_type', 'compact',
+                       'compress_level', 'optimize')
+
+def result_cache_key(text, options):
+    """Content hash of a payload and every option that affects its output"""
+    params = {field: options.get(field) for field in RESULT_CACHE_FIELDS}
+    params['format_type'] = (params['format_type'] or 'PNG').upper()
+    if options.get('invert'):
+        # Only set when used, so keys of existing entries stay valid
+        params['invert'] = True
+    logo = options.get('logo')
+    if logo:
+        # Identify the logo by path, mtime and size rather than hashing its content
+        try:
+            stat = os.stat(logo)
+            params['logo'] = [os.path.abspath(logo), stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            params['logo'] = [os.path.abspath(logo), None, None]
+    import hashlib
+    import json
+    payload = json.dumps([RESULT_CACHE_VERSION, text, params], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+@contextlib.contextmanager
+def atomic_output(path):
+    """Open a temporary file beside path for writing, then move it over path.
+
+    Readers never see a partial file, and other names linked to the old file
+    keep their contents.
+    """
+    path = Path(path)
+    # Keep the suffix, which tells Pillow the format (see _encode_image)
+    temp_path = path.with_name(f".{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{path.suffix}")
+    try:
+        with open(temp_path, 'wb') as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            temp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+def copy_output(source, destination):
+    """Copy a finished output (or cache entry) to destination, replacing it atomically"""
+    import shutil
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    with open(source, 'rb') as src, atomic_output(destination) as dst:
+        shutil.copyfileobj(src, dst)
+
+class ResultCache:
+    """Persistent content-addressed store of finished QR code files.
+
+    Entries never share an inode with outputs, so rewriting an output cannot
+    change the cache.
+    """
+    
+    def __init__(self, directory):
+        self.directory = Path(directory)
+    
+    def entry_path(self, key):
+        """Path of the cache entry for a key"""
+        return self.directory / key[:2] / key
+    
+    def fetch(self, key, output_path):
+        """Place a cached result at output_path, returning True on a hit"""
+        entry = self.entry_path(key)
+        if not entry.exists():
+            return False
+        try:
+            copy_output(entry, output_path)
+            return True
+        except OSError:
+            return False
+    
+    def read(self, key):
+        """Return the cached bytes for a key, or None on a miss"""
+        try:
+            return self.entry_path(key).read_bytes()
+        except OSError:
+            return None
+    
+    def store(self, key, output_path=None, data=None):
+        """Add a freshly written output file, or its encoded bytes, to the cache"""
+        entry = self.entry_path(key)
+        try:
+            if data is not None and entry.exists():
+                return
+            if data is None:
+                copy_output(output_path, entry)
+                return
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            # Publish atomically for concurrent workers
+            with atomic_output(entry) as f:
+                f.write(data)
+        except OSError:
+            pass
+
+class BatchCheckpoint:
+    """Manifest of the batch lines already written, for resuming a run.
+
+    Each line is '<index> <first 16 hex digits of result_cache_key()>', so a
+    line only counts as done while its text and settings are unchanged. Entries
+    are appended in batches; a torn last line from a crash is dropped on load.
+    """
+    
+    def __init__(self, path, flush_every=1000, flush_interval=2.0):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.done = {}
+        self.pending = []
+        self.skipped = 0
+        self._last_flush = time.monotonic()
+    
+    @staticmethod
+    def _digest(key):
+        """Compact form of a result key kept in memory and in the manifest"""
+        return int(key[:16], 16)
+    
+    def load(self):
+        """Read the entries of an existing manifest, truncating a torn last line"""
+        try:
+            with open(self.path, 'rb+') as f:
+                data = f.read()
+                end = data.rfind(b'\n') + 1
+                if end < len(data):
+                    f.truncate(end)
+        except FileNotFoundError:
+            return self
+        for line in data[:end].splitlines():
+            try:
+                index, digest = line.split()
+                self.done[int(index)] = int(digest, 16)
+            except ValueError:
+                continue
+        return self
+    
+    def is_done(self, index, key, output_path):
+        """Whether a line was written with the same key and its output still exists"""
+        return self.done.get(index) == self._digest(key) and os.path.exists(output_path)
+    
+    def record(self, index, key):
+        """Mark a line as written, appending to the manifest once a batch is full"""
+        self.pending.append(f"{index} {key[:16]}\n")
+        if (len(self.pending) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+    
+    def flush(self):
+        """Append pending entries to the manifest and sync it to disk"""
+        self._last_flush = time.monotonic()
+        if not self.pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='ascii') as f:
+            f.writelines(self.pending)
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending.clear()
+
+def batch_checkpoint_path(output):
+    """Default checkpoint manifest, named like the outputs of batch_output_name()"""
+    return f"{Path(output).stem}.checkpoint"
+
+@contextlib.contextmanager
+def open_batch_source(source):
+    """Open a batch file, or stdin for '-', as a text stream"""
+    if source == '-':
+        yield io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        return
+    with open(source, 'r', encoding='utf-8', newline='') as f:
+        yield f
+
+def iter_batch_lines(source):
+    """Lazily yield the non-empty, stripped lines of a batch file or stdin ('-')"""
+    with open_batch_source(source) as stream:
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield line
+
+# One batch record: options is shared by rows with the same settings, output
+# is None for the default stem_<index> name, and error is set for rows that
+# could not be parsed
+BatchRow = collections.namedtuple('BatchRow', 'text options output error')
+
+# Output suffix used when a row picks another format without naming its output
+FORMAT_SUFFIXES = {'PNG': '.png', 'JPEG': '.jpg', 'BMP': '.bmp', 'TIFF': '.tiff', 'SVG': '.svg',
+                   'TERM': '.txt', 'MATRIX': '.txt'}
+
+# Distinct row settings kept for sharing between rows
+BATCH_SHARED_OPTIONS = 4096
+
+def batch_input_format(source, batch_format='auto'):
+    """Resolve 'auto' to 'csv', 'jsonl' or 'lines' from the file extension"""
+    if batch_format != 'auto':
+        return batch_format
+    suffix = Path(source).suffix.lower()
+    if suffix == '.csv':
+        return 'csv'
+    if suffix in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'lines'
+
+def batch_row(params, defaults, shared):
+    """Build a BatchRow from one CSV/JSONL record of CLI-style parameters.
+
+    Rows with the same settings get the same options dict from shared, so they
+    are validated once and grouped downstream.
+    """
+    import json
+    if None in params:
+        return BatchRow(None, None, None, "more fields than the header")
+    params = {name: value for name, value in params.items() if value not in (None, '')}
+    output = params.pop('output', None)
+    text, options, error = merge_params(params, defaults, BATCH_ROW_PARAMS)
+    if error:
+        return BatchRow(text, None, None, error)
+    if not text:
+        return BatchRow(text, None, None, "Text cannot be empty!")
+    if output is None and options['format_type'] != defaults['format_type']:
+        options['output'] = str(Path(defaults['output']).with_suffix(
+            FORMAT_SUFFIXES.get(options['format_type'], '')))
+    
+    key = json.dumps(options, sort_keys=True)
+    if key not in shared:
+        error = validate_options(options)
+        if error:
+            return BatchRow(text, None, None, error)
+        if len(shared) >= BATCH_SHARED_OPTIONS:
+            shared.clear()
+        shared[key] = options
+    return BatchRow(text, shared[key], output, None)
+
+def iter_batch_rows(source, defaults, batch_format='auto'):
+    """Lazily yield a BatchRow for each record of a batch file or stdin ('-').
+
+    CSV and JSONL records set 'text' and may override 'output', 'logo' and any
+    --serve parameter.
+    """
+    import json
+    batch_format = batch_input_format(source, batch_format)
+    if batch_format == 'lines':
+        for line in iter_batch_lines(source):
+            yield BatchRow(line, defaults, None, None)
+        return
+    
+    import csv
+    shared = {}
+    with open_batch_source(source) as stream:
+        if batch_format == 'csv':
+            for record in csv.DictReader(stream):
+                yield batch_row(record, defaults, shared)
+            return
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield BatchRow(None, None, None, f"invalid JSON: {e}")
+                continue
+            if isinstance(record, str):
+                record = {'text': record}
+            if not isinstance(record, dict):
+                yield BatchRow(None, None, None, "expected a JSON object or string")
+                continue
+            yield batch_row(record, defaults, shared)
+
+def batch_options_from_args(args):
+    """Collect the per-line generation settings for batch mode"""
+    return {
+        'output': args.output,
+        'box_size': args.size,
+        'border': args.border,
+        'fill_color': args.fill_color,
+        'back_color': args.back_color,
+        'error_correction': args.error_correction,
+        'version': args.version,
+        'format_type': args.format,
+        'logo': args.logo,
+        'logo_size': args.logo_size,
+        'rounded': args.rounded,
+        'compact': args.compact,
+        'invert': args.invert,
+        'compress_level': args.compress_level,
+        'optimize': args.optimize,
+        'cache_dir': args.cache_dir,
+        'archive': bool(args.archive),
+    }
+
+def _batch_success_message(output_name, text):
+    """Success message for one batch line"""
+    return f"Generated {output_name} for: {text[:50]}{'...' if len(text) > 50 else ''}"
+
+def build_qr_image(generator, text, options, max_side=None):
+    """Generate and decorate one code from a batch-style options dict.
+
+    With max_side, raster codes wider than max_side pixels fail before any
+    image is allocated. Returns (img, error, warnings).
+    """
+    kwargs = dict(
+        box_size=options['box_size'],
+        border=options['border'],
+        fill_color=options['fill_color'],
+        back_color=options['back_color'],
+        error_correction=options['error_correction'],
+        version=options['version'],
+        format_type=options['format_type'],
+        compact=options.get('compact', False),
+        invert=options.get('invert', False)
+    )
+    qr, error = generator.encode_qr(text, **kwargs)
+    if error:
+        return None, error, []
+    if max_side is not None and options['format_type'] != 'SVG' and options['format_type'] not in TEXT_FORMATS:
+        side = (qr.modules_count + 2 * options['border']) * options['box_size']
+        if side > max_side:
+            return None, f"Image would be {side} pixels wide, more than the {max_side} allowed", []
+    
+    img, error = generator.draw_qr(qr, **kwargs)
+    if error:
+        return None, error, []
+    
+    img, warnings = generator.decorate_qr(img, options['logo'], options['logo_size'], options['rounded'],
+                                          flatten=options['format_type'].upper() == 'JPEG')
+    return img, None, warnings
+
+def encode_batch_item(generator, index, text, options, output_name):
+    """Generate, decorate and encode one batch line in memory (the CPU-bound half).
+
+    Returns (data, (success, messages)); data is None when the result is
+    already final (a cache hit or a failure).
+    """
+    messages = []
+    
+    cache = ResultCache(options['cache_dir']) if options.get('cache_dir') else None
+    if cache is not None:
+        key = result_cache_key(text, options)
+        if options.get('archive'):
+            # Archive entries need the bytes; the writer adds them
+            data = cache.read(key)
+            if data is not None:
+                if generator.stats is not None:
+                    generator.stats.count('cache_hits')
+                return data, (True, messages)
+        elif cache.fetch(key, output_name):
+            if generator.stats is not None:
+                generator.stats.count('cache_hits')
+            messages.append(('success', _batch_success_message(output_name, text)))
+            return None, (True, messages)
+    
+    img, error, warnings = build_qr_image(generator, text, options)
+    
+    if error:
+        messages.append(('error', f"Failed to generate QR for line {index}: {error}"))
+        return None, (False, messages)
+    
+    for feature, warning in warnings:
+        messages.append(('warning', f"{feature} warning for {output_name}: {warning}"))
+    
+    data, error = generator.to_bytes(img, options['format_type'],
+                                     options.get('compress_level'), options.get('optimize', False))
+    if error:
+        messages.append(('error', f"Failed to save {output_name}: {error}"))
+        return None, (False, messages)
+    return data, (True, messages)
+
+def write_batch_item(data, text, options, output_name, messages, stats=None):
+    """Write an encoded batch line and add it to the result cache, returning (success, messages)"""
+    start = time.perf_counter()
+    try:
+        output_path = Path(output_name)
+        _ensure_directory(output_path.parent)
+        with atomic_output(output_path) as f:
+            f.write(data)
+    except OSError as e:
+        messages.append(('error', f"Failed to save {output_name}: {e}"))
+        return False, messages
+    finally:
+        if stats is not None:
+            stats.record('write', time.perf_counter() - start)
+    
+    if options.get('cache_dir'):
+        ResultCache(options['cache_dir']).store(result_cache_key(text, options), data=data)
+    messages.append(('success', _batch_success_message(output_name, text)))
+    return True, messages
+
+@functools.lru_cache(maxsize=1024)
+def _ensure_directory(directory):
+    """Create an output directory once per run rather than once per file"""
+    directory.mkdir(parents=True, exist_ok=True)
+
+def archive_batch_item(sink, data, text, options, output_name, messages, stats=None):
+    """Add an encoded batch line to an ArchiveSink, like write_batch_item() does for files"""
+    start = time.perf_counter()
+    try:
+        sink.add(output_name, data)
+    except Exception as e:
+        messages.append(('error', f"Failed to add {output_name} to the archive: {e}"))
+        return False, messages
+    finally:
+        if stats is not None:
+            stats.record('write', time.perf_counter() - start)
+    
+    if options.get('cache_dir'):
+        ResultCache(options['cache_dir']).store(result_cache_key(text, options), data=data)
+    messages.append(('success', _batch_success_message(output_name, text)))
+    return True, messages
+
+def process_batch_item(generator, index, text, options, output_name=None):
+    """Generate, decorate and save one batch line, returning (success, messages)"""
+    output_name = output_name or batch_output_name(options['output'], index)
+    data, result = encode_batch_item(generator, index, text, options, output_name)
+    if data is None:
+        return result
+    return write_batch_item(data, text, options, output_name, result[1], generator.stats)
+
+# Generator owned by each batch worker process, created once by the initializer
+_worker_generator = None
+
+def _init_batch_worker(collect_stats=False):
+    """Create the generator reused by a batch worker process"""
+    global _worker_generator
+    load_numpy()
+    _worker_generator = QRGenerator(stats=StageStats() if collect_stats else None)
+
+async def _aiter_sync(iterable):
+    """Adapt a plain iterable for async for"""
+    for item in iterable:
+        yield item
+
+def _call_worker_generator(method, args, kwargs):
+    """Call a QRGenerator method on this worker process's generator (async API)"""
+    if _worker_generator is None:
+        _init_batch_worker()
+    return getattr(_worker_generator, method)(*args, **kwargs)
+
+def _process_batch_chunk(chunk):
+    """Encode an (options, [(index, text, output_name), ...]) chunk inside a worker process.
+
+    Returns (results, stats); writing is left to the parent.
+    """
+    options, items = chunk
+    results = [(index, encode_batch_item(_worker_generator, index, text, options, output_name))
+               for index, text, output_name in items]
+    stats = _worker_generator.stats.drain() if _worker_generator.stats is not None else None
+    return results, stats
+
+def _unpack_chunk_results(chunks, stats=None):
+    """Flatten chunk results from the workers, merging their stage timings into stats"""
+    for results, snapshot in chunks:
+        if stats is not None and snapshot is not None:
+            stats.merge(snapshot)
+        yield from results
+
+def copy_batch_duplicate(index, text, first, output_name, sink=None):
+    """Reuse the output of an earlier identical batch line, returning (success, messages).
+
+    first is that line's [index, success, output_name, data] record. With a
+    sink, the line names the same archive entry, which is already added.
+    """
+    first_index, first_success, first_output, _ = first
+    if not first_success:
+        return False, [('error', f"Failed to generate QR for line {index}: same input as failed line {first_index}")]
+    if sink is not None:
+        return True, [('success', _batch_success_message(output_name, text))]
+    try:
+        # A row naming the same output as its first occurrence is already written
+        if not (os.path.abspath(first_output) == os.path.abspath(output_name)
+                or os.path.exists(output_name) and os.path.samefile(first_output, output_name)):
+            copy_output(first_output, output_name)
+    except OSError as e:
+        return False, [('error', f"Failed to save {output_name}: {e}")]
+    return True, [('success', _batch_success_message(output_name, text))]
+
+# Distinct payloads remembered for de-duplicating a batch
+BATCH_DEDUP_WINDOW = 100000
+
+# Distinct payloads whose encoded bytes are kept for repeating them in an archive
+BATCH_ARCHIVE_REUSE = 1024
+
+# A batch line on its way through run_batch(): key is its result_cache_key(),
+# first the [index, success, output_name, data] record of the first line with
+# the same key (data is kept in archive mode only), and error is set for rows
+# that could not be parsed
+BatchItem = collections.namedtuple('BatchItem', 'index text options output key first error')
+
+def _dedupe_batch(numbered, window=BATCH_DEDUP_WINDOW, payload_window=None, output_key=os.path.abspath):
+    """Turn numbered BatchRows into BatchItems tagged with their first occurrence.
+
+    A line reusing a recent output (compared by output_key) for another payload
+    gets an error. Only the last window outputs and payload_window payloads are
+    remembered; a window of 0 turns both checks off.
+    """
+    if payload_window is None:
+        payload_window = window
+    seen = collections.OrderedDict()
+    outputs = collections.OrderedDict()
+    for index, row in numbered:
+        if row.error:
+            yield BatchItem(index, row.text, None, None, None, None, row.error)
+            continue
+        output = row.output or batch_output_name(row.options['output'], index)
+        key = result_cache_key(row.text, row.options)
+        if window:
+            name = output_key(output)
+            used = outputs.get(name)
+            if used is not None and used[1] != key:
+                yield BatchItem(index, row.text, None, None, None, None,
+                                f"Output {output} is already used by line {used[0]}")
+                continue
+            if used is None:
+                outputs[name] = (index, key)
+                if len(outputs) > window:
+                    outputs.popitem(last=False)
+        first = seen.get(key) if payload_window else None
+        if first is None:
+            first = [index, None, output, None]
+            if payload_window:
+                seen[key] = first
+                if len(seen) > payload_window:
+                    seen.popitem(last=False)
+        else:
+            seen.move_to_end(key)
+        yield BatchItem(index, row.text, row.options, output, key, first, None)
+
+def _resume_batch(items, checkpoint):
+    """Pair batch items with whether the checkpoint lists them as done.
+
+    A done first occurrence counts as successful, so its repeats are copied
+    from its output.
+    """
+    for item in items:
+        done = (checkpoint is not None and item.error is None
+                and checkpoint.is_done(item.index, item.key, item.output))
+        if done and item.first[0] == item.index:
+            item.first[1] = True
+        yield item, done
+
+def _ordered_imap(executor, fn, iterable, window):
+    """Like executor.map, but submits lazily and keeps at most window tasks in flight"""
+    pending = collections.deque()
+    try:
+        for item in iterable:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+# Lines per task handed to a batch worker process
+BATCH_CHUNK_SIZE = 16
+
+# Rows at most this far apart may be regrouped by their settings. This also
+# bounds how many later rows are encoded while an earlier one is held back
+BATCH_GROUP_WINDOW = 64
+
+def _grouped_chunks(items, size=BATCH_CHUNK_SIZE, window=BATCH_GROUP_WINDOW, wanted=None):
+    """Gather batch items into (options, [(index, text, output_name), ...]) chunks.
+
+    A chunk goes out when full, when its first row is window lines old, or when
+    it holds wanted[0], the line the consumer is waiting for.
+    """
+    groups = {}
+    for item in items:
+        group = groups.get(id(item.options))
+        if group is None:
+            group = groups[id(item.options)] = (item.options, [])
+        group[1].append((item.index, item.text, item.output))
+        if len(group[1]) >= size:
+            del groups[id(item.options)]
+            yield group
+        # Groups are kept in the order of their first rows
+        while groups:
+            options, rows = next(iter(groups.values()))
+            first = rows[0][0]
+            if first > item.index - window and (wanted is None or first > wanted[0]):
+                break
+            del groups[id(options)]
+            yield options, rows
+    yield from groups.values()
+
+# Input rows read ahead of the encoder by the reader thread
+BATCH_READ_AHEAD = 256
+
+def _read_ahead(iterable, size=BATCH_READ_AHEAD):
+    """Iterate over iterable from a reader thread, staying at most size items ahead.
+
+    Exceptions raised while reading are re-raised in the consumer.
+    """
+    import queue
+    items = queue.Queue(size)
+    stop = threading.Event()
+    end = object()
+    
+    def put(entry):
+        while not stop.is_set():
+            try:
+                items.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+    
+    def reader():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((end, e))
+    
+    threading.Thread(target=reader, name='qr-batch-reader', daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+
+# Threads writing batch outputs, and encoded outputs allowed to wait for them
+BATCH_WRITERS = 4
+BATCH_WRITE_QUEUE = 64
+
+class BatchWriter:
+    """Pool of threads writing batch outputs while encoding carries on.
+
+    submit() blocks once queue_size writes are pending, holding the encoder
+    back. With no threads it writes inline.
+    """
+    
+    def __init__(self, threads=BATCH_WRITERS, queue_size=BATCH_WRITE_QUEUE):
+        from concurrent.futures import Future, ThreadPoolExecutor
+        self._future = Future
+        self._executor = None
+        if threads > 0:
+            self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='qr-batch-writer')
+        self._slots = threading.BoundedSemaphore(queue_size)
+    
+    def submit(self, fn, *args):
+        """Run fn(*args) on a writer thread, returning a Future of its result"""
+        if self._executor is None:
+            future = self._future()
+            future.set_result(fn(*args))
+            return future
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+    
+    def close(self):
+        """Wait for the queued writes and stop the threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+class ArchiveSink:
+    """One ZIP or tar archive receiving batch outputs as entries.
+
+    A path of '-' streams the archive to stdout. Entry times come from
+    SOURCE_DATE_EPOCH when set, so identical runs give identical archives.
+    """
+    
+    FORMATS = ('zip', 'tar', 'tar.gz')
+    
+    # Already compressed formats, stored in ZIPs without deflating them again
+    STORED_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif')
+    
+    def __init__(self, path, archive_format=None):
+        self.path = path
+        self.format = archive_format or self.format_for(path)
+        self.mtime = int(os.environ.get('SOURCE_DATE_EPOCH') or time.time())
+        target = sys.stdout.buffer if path == '-' else path
+        if self.format == 'zip':
+            import zipfile
+            self._zipfile = zipfile
+            self._archive = zipfile.ZipFile(target, 'w')
+        else:
+            import tarfile
+            self._tarfile = tarfile
+            self._file = target if path == '-' else open(target, 'wb')
+            fileobj = self._file
+            if self.format == 'tar.gz':
+                import gzip
+                # tarfile's own gzip stream stamps the header with the current time
+                fileobj = self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=fileobj, mtime=self.mtime)
+            self._archive = tarfile.open(fileobj=fileobj, mode='w|')
+    
+    @staticmethod
+    def format_for(path):
+        """Pick the archive format from a file name; stdout and unknown names get tar"""
+        name = str(path).lower()
+        if name.endswith('.zip'):
+            return 'zip'
+        if name.endswith(('.tar.gz', '.tgz')):
+            return 'tar.gz'
+        return 'tar'
+    
+    @staticmethod
+    def entry_name(output_name):
+        """Relative, forward-slash archive name for an output path"""
+        name = posixpath.normpath(Path(output_name).as_posix()).lstrip('/')
+        while name.startswith('../'):
+            name = name[3:]
+        return name
+    
+    def add(self, output_name, data):
+        """Append one file to the archive"""
+        name = self.entry_name(output_name)
+        if self.format == 'zip':
+            zipfile = self._zipfile
+            # ZIP cannot represent dates before 1980
+            info = zipfile.ZipInfo(name, time.localtime(max(self.mtime, 315532800))[:6])
+            info.external_attr = 0o644 << 16
+            compress = (zipfile.ZIP_STORED if name.lower().endswith(self.STORED_SUFFIXES)
+                        else zipfile.ZIP_DEFLATED)
+            self._archive.writestr(info, data, compress_type=compress)
+        else:
+            info = self._tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = self.mtime
+            info.mode = 0o644
+            self._archive.addfile(info, io.BytesIO(data))
+    
+    def close(self):
+        """Finish the archive (central directory or end-of-archive blocks)"""
+        self._archive.close()
+        if self.format == 'tar.gz':
+            self._gzip.close()
+        if self.format != 'zip' and self.path != '-':
+            self._file.close()
+        if self.path == '-':
+            sys.stdout.buffer.flush()
+
+def run_batch(lines, options, jobs=1, quiet=False, stats=None, checkpoint=None, writers=BATCH_WRITERS,
+              sink=None):
+    """Process batch lines as a pipeline of reader, encoder and writer stages.
+
+    lines are texts (using options) or BatchRows. Results are reported in input
+    order whatever the number of jobs, and repeated payloads reuse their first
+    occurrence. checkpoint skips and records finished lines; with sink, outputs
+    become archive entries and options should have 'archive' set. Returns
+    (success_count, total).
+    """
+    printers = {'success': print_success, 'warning': print_warning, 'error': print_error}
+    rows = (line if isinstance(line, BatchRow) else BatchRow(line, options, None, None)
+            for line in _read_ahead(lines))
+    # Identical lines are only generated once; the reporting loop below
+    # walks the same items in input order, matching results up by index
+    if sink is None:
+        items = _dedupe_batch(enumerate(rows, 1))
+    else:
+        # Repeats reuse the first entry's bytes, which are kept for fewer payloads
+        items = _dedupe_batch(enumerate(rows, 1), payload_window=BATCH_ARCHIVE_REUSE,
+                              output_key=sink.entry_name)
+    planned, reported = itertools.tee(_resume_batch(items, checkpoint))
+    # The line the reporting loop is waiting for, so its chunk is not held back
+    wanted = [0]
+    chunks = _grouped_chunks((item for item, done in planned
+                              if not done and item.error is None and item.first[0] == item.index),
+                             wanted=wanted)
+    
+    if jobs > 1:
+        # Hand out work in chunks so the IPC cost is amortised over several codes,
+        # while keeping enough chunks queued to balance load between workers.
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                                       initargs=(stats is not None,))
+        results = _unpack_chunk_results(_ordered_imap(executor, _process_batch_chunk, chunks,
+                                                      window=jobs * 4), stats)
+    else:
+        executor = None
+        load_numpy()
+        generator = QRGenerator(stats=stats)
+        results = ((index, encode_batch_item(generator, index, text, chunk_options, output_name))
+                   for chunk_options, items in chunks for index, text, output_name in items)
+    if sink is None:
+        write = write_batch_item
+        writer = BatchWriter(writers)
+    else:
+        # A single writer thread keeps the entries in submission (input) order
+        write = functools.partial(archive_batch_item, sink)
+        writer = BatchWriter(min(writers, 1))
+    
+    success_count = 0
+    total = 0
+    
+    def report(item, done, result):
+        """Settle one line, in input order"""
+        nonlocal success_count
+        if done:
+            checkpoint.skipped += 1
+            success_count += 1
+            return
+        if item.error:
+            result = False, [('error', f"Invalid line {item.index}: {item.error}")]
+        elif item.first[0] != item.index:
+            # The first occurrence comes earlier in order, so it is done
+            if result is None:
+                result = copy_batch_duplicate(item.index, item.text, item.first, item.output, sink)
+            elif not isinstance(result, tuple):
+                result = result.result()
+            if stats is not None:
+                stats.count('duplicates')
+        else:
+            if not isinstance(result, tuple):
+                result = result.result()
+            item.first[1] = result[0]
+        success, messages = result
+        if success:
+            success_count += 1
+            if checkpoint is not None:
+                checkpoint.record(item.index, item.key)
+        if not quiet:
+            for level, message in messages:
+                printers[level](message)
+    
+    # Encoded results that arrived ahead of their turn, by line index, and
+    # lines waiting (in order) for their write to finish
+    ready = {}
+    pending = collections.deque()
+    try:
+        for item, done in reported:
+            total += 1
+            result = None
+            if not done and item.error is None and item.first[0] == item.index:
+                wanted[0] = item.index
+                while item.index not in ready:
+                    index, encoded = next(results)
+                    ready[index] = encoded
+                data, result = ready.pop(item.index)
+                if data is not None:
+                    if sink is not None:
+                        item.first[3] = data
+                    result = writer.submit(write, data, item.text, item.options, item.output, result[1], stats)
+            elif (sink is not None and not done and item.error is None and item.first[3] is not None
+                  and sink.entry_name(item.output) != sink.entry_name(item.first[2])):
+                # Add the repeat in its place in the archive, with the first entry's bytes
+                result = writer.submit(write, item.first[3], item.text, item.options, item.output, [], stats)
+            pending.append((item, done, result))
+            while pending and (len(pending) >= BATCH_WRITE_QUEUE or pending[0][2] is None
+                               or isinstance(pending[0][2], tuple) or pending[0][2].done()):
+                report(*pending.popleft())
+        while pending:
+            report(*pending.popleft())
+    finally:
+        writer.close()
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if checkpoint is not None:
+            checkpoint.flush()
+    return success_count, total
+
+def _parse_flag(value):
+    """Interpret a request parameter as a boolean flag"""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+def _parse_int(value):
+    """Interpret a request parameter as an integer; JSON numbers must be whole"""
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(value)
+    return int(value)
+
+# Request parameters accepted by --serve, named like the CLI options
+SERVE_PARAMS = {
+    'text': ('text', str),
+    'size': ('box_size', _parse_int),
+    'border': ('border', _parse_int),
+    'error-correction': ('error_correction', str.upper),
+    'version': ('version', _parse_int),
+    'fill-color': ('fill_color', str),
+    'back-color': ('back_color', str),
+    'logo-size': ('logo_size', float),
+    'rounded': ('rounded', _parse_flag),
+    'format': ('format_type', str.upper),
+    'compact': ('compact', _parse_flag),
+    'invert': ('invert', _parse_flag),
+    'compress-level': ('compress_level', _parse_int),
+    'optimize': ('optimize', _parse_flag),
+}
+
+# Per-row parameters of CSV/JSONL batch input; unlike requests, rows may
+# also name a logo file (and their output, handled by batch_row())
+BATCH_ROW_PARAMS = dict(SERVE_PARAMS, logo=('logo', str))
+
+def merge_params(params, defaults, spec=SERVE_PARAMS):
+    """Merge CLI-style named parameters from spec over a copy of defaults.
+
+    Returns (text, options, error). The options are checked by
+    validate_options().
+    """
+    options = dict(defaults)
+    text = None
+    for name, value in params.items():
+        name = name.lower().replace('_', '-')
+        if name not in spec:
+            return None, None, f"Unknown parameter: {name}"
+        key, convert = spec[name]
+        try:
+            value = convert(value)
+        except (TypeError, ValueError, OverflowError):
+            return None, None, f"Invalid value for {name}: {value}"
+        if key == 'text':
+            text = value
+        else:
+            options[key] = value
+    return text, options, None
+
+CONTENT_TYPES = {
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+    'BMP': 'image/bmp',
+    'TIFF': 'image/tiff',
+    'SVG': 'image/svg+xml',
+    'TERM': 'text/plain; charset=utf-8',
+    'MATRIX': 'text/plain; charset=utf-8',
+}
+
+def validate_options(options):
+    """Check batch-style options against the CLI limits, returning an error message or None"""
+    if not 1 <= options['box_size'] <= 50:
+        return "Box size must be between 1 and 50"
+    if not 0 <= options['border'] <= 20:
+        return "Border size must be between 0 and 20"
+    if not 0.1 <= options['logo_size'] <= 0.4:
+        return "Logo size ratio must be between 0.1 and 0.4"
+    if options.get('compress_level') is not None and not 0 <= options['compress_level'] <= 9:
+        return "Compression level must be between 0 and 9"
+    if options['version'] is not None and not 1 <= options['version'] <= 40:
+        return "QR code version must be between 1 and 40"
+    if options['error_correction'] not in ('L', 'M', 'Q', 'H'):
+        return "Error correction must be L, M, Q or H"
+    if options['format_type'] not in CONTENT_TYPES:
+        return f"Invalid format! Choose from {', '.join(CONTENT_TYPES)}."
+    if not validate_color(options['fill_color']):
+        return f"Invalid fill color: {options['fill_color']}"
+    if not validate_color(options['back_color']):
+        return f"Invalid background color: {options['back_color']}"
+    return None
+
+# Per-rendition parameters of --rendition; encoding settings (error
+# correction, version) are shared by every rendition of a code
+RENDITION_PARAMS = {name: param for name, param in BATCH_ROW_PARAMS.items()
+                    if name not in ('text', 'error-correction', 'version')}
+RENDITION_PARAMS['output'] = ('output', str)
+
+def parse_rendition(spec, defaults, index):
+    """Parse a --rendition spec of comma-separated name=value pairs, returning (options, error).
+
+    Unset options come from defaults; without an output the file is named after
+    the main output, e.g. qrcode_2.svg.
+    """
+    params = {}
+    for pair in filter(None, (part.strip() for part in spec.split(','))):
+        name, sep, value = pair.partition('=')
+        if not sep:
+            return None, f"Invalid rendition parameter (expected name=value): {pair}"
+        params[name.strip()] = value.strip()
+    _, options, error = merge_params(params, defaults, RENDITION_PARAMS)
+    if error:
+        return None, error
+    error = validate_options(options)
+    if error:
+        return None, error
+    if options['output'] == '-':
+        return None, "Renditions cannot be written to stdout"
+    if 'output' not in params:
+        output = Path(defaults['output'])
+        options['output'] = str(output.with_name(
+            f"{output.stem}_{index}{FORMAT_SUFFIXES[options['format_type']]}"))
+    return options, None
+
+def save_renditions(generator, text, defaults, renditions, quiet=False):
+    """Encode text once and write each rendition, returning the number written.
+
+    Renditions found in their cache_dir are copied from it instead.
+    """
+    caches = [ResultCache(options['cache_dir']) if options.get('cache_dir') else None
+              for options in renditions]
+    keys = [result_cache_key(text, options) if cache is not None else None
+            for options, cache in zip(renditions, caches)]
+    pending = []
+    success_count = 0
+    for options, cache, key in zip(renditions, caches, keys):
+        if cache is not None and cache.fetch(key, options['output']):
+            success_count += 1
+            if generator.stats is not None:
+                generator.stats.count('cache_hits')
+            if not quiet:
+                print_success(f"QR code saved as: {options['output']} (from cache)")
+        else:
+            pending.append((options, cache, key))
+    if not pending:
+        return success_count
+    
+    results, error = generator.render_renditions(text, [options for options, _, _ in pending], **defaults)
+    if error:
+        print_error(f"Error generating QR code: {error}")
+        return success_count
+    for (options, cache, key), (data, error, warnings) in zip(pending, results):
+        if not quiet:
+            for _, warning in warnings:
+                print_warning(f"{options['output']}: {warning}")
+        if error:
+            print_error(f"Failed to render {options['output']}: {error}")
+            continue
+        try:
+            output = Path(options['output'])
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with generator.stats.time('write') if generator.stats else contextlib.nullcontext():
+                with atomic_output(output) as f:
+                    f.write(data)
+        except OSError as e:
+            print_error(f"Failed to save QR code: {e}")
+            continue
+        if cache is not None:
+            cache.store(key, data=data)
+        success_count += 1
+        if not quiet:
+            print_success(f"QR code saved as: {output}")
+    return success_count
+
+def _serve_render(text, options, max_side=None):
+    """Render one code to bytes with the warm worker generator. Returns (data, error)"""
+    img, error, _ = build_qr_image(_worker_generator, text, options, max_side)
+    if error:
+        return None, f"Error generating QR code: {error}"
+    data, error = _worker_generator.to_bytes(img, options['format_type'],
+                                             options.get('compress_level'), options.get('optimize', False))
+    if error:
+        return None, f"Failed to encode QR code: {error}"
+    return data, None
+
+class QRServer:
+    """Minimal asyncio HTTP/1.1 server returning QR code images.
+
+    GET /qr?text=... (or POST the same parameters as JSON or a form) answers
+    with the image. Hot payloads come from an in-memory LRU bounded by
+    cache_size responses and cache_bytes bytes.
+    """
+    
+    # Largest accepted request body in bytes
+    max_body = 64 * 1024
+    
+    # Widest raster image rendered, in pixels
+    max_image_side = 4096
+    
+    def __init__(self, defaults, jobs=1, cache_size=1024, cache_bytes=64 * 1024 * 1024):
+        self.defaults = dict(defaults)
+        self.jobs = jobs
+        self.cache_size = cache_size
+        self.cache_bytes = cache_bytes
+        self._cache = collections.OrderedDict()
+        self._cache_used = 0
+        self._executor = None
+        self._slots = None
+    
+    def start_pool(self):
+        """Create the render pool and the limit on in-flight renders"""
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        if self.jobs > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_batch_worker)
+        else:
+            _init_batch_worker()
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        self._slots = asyncio.Semaphore(self.jobs * 2)
+    
+    def close(self):
+        """Shut the render pool down"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+    
+    def parse_options(self, params):
+        """Merge request parameters over the defaults. Returns (text, options, error)"""
+        text, options, error = merge_params(params, self.defaults)
+        if error:
+            return None, None, error
+        if not text:
+            return None, None, "Text cannot be empty!"
+        return text, options, validate_options(options)
+    
+    async def render(self, text, options):
+        """Render through the LRU and the worker pool. Returns (data, error)"""
+        key = result_cache_key(text, options)
+        data = self._cache.get(key)
+        if data is not None:
+            self._cache.move_to_end(key)
+            return data, None
+        
+        import asyncio
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            data, error = await loop.run_in_executor(self._executor, _serve_render, text, options,
+                                                     self.max_image_side)
+        if error:
+            return None, error
+        
+        if len(data) <= self.cache_bytes // 16 and key not in self._cache:
+            self._cache[key] = data
+            self._cache_used += len(data)
+            while len(self._cache) > self.cache_size or self._cache_used > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_used -= len(evicted)
+        return data, None
+    
+    async def respond(self, method, target, headers, body):
+        """Handle one request. Returns (status, content_type, payload)"""
+        import json
+        import urllib.parse
+        url = urllib.parse.urlsplit(target)
+        if url.path == '/health':
+            return 200, 'text/plain', b'ok'
+        if url.path not in ('/', '/qr'):
+            return 404, 'text/plain', b'Not found'
+        
+        if method in ('GET', 'HEAD'):
+            params = dict(urllib.parse.parse_qsl(url.query))
+        elif method == 'POST':
+            content_type = headers.get('content-type', '')
+            try:
+                if content_type.startswith('application/json'):
+                    params = json.loads(body.decode('utf-8'))
+                    if not isinstance(params, dict):
+                        raise ValueError("expected a JSON object")
+                else:
+                    params = dict(urllib.parse.parse_qsl(body.decode('utf-8')))
+            except ValueError as e:
+                return 400, 'text/plain', f"Invalid request body: {e}".encode('utf-8')
+        else:
+            return 405, 'text/plain', b'Method not allowed'
+        
+        text, options, error = self.parse_options(params)
+        if error:
+            return 400, 'text/plain', error.encode('utf-8')
+        
+        data, error = await self.render(text, options)
+        if error:
+            return 422, 'text/plain', error.encode('utf-8')
+        return 200, CONTENT_TYPES[options['format_type']], data
+    
+    async def handle_connection(self, reader, writer):
+        """Serve the requests of one (possibly keep-alive) connection"""
+        import asyncio
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                
+                if len(parts) != 3:
+                    await self.send(writer, 400, 'text/plain', b'Bad request', keep_alive=False)
+                    break
+                method, target, http_version = parts
+                try:
+                    length = int(headers.get('content-length') or 0)
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    await self.send(writer, 400, 'text/plain', b'Invalid Content-Length', keep_alive=False)
+                    break
+                if length > self.max_body:
+                    await self.send(writer, 413, 'text/plain', b'Request body too large', keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                
+                try:
+                    status, content_type, payload = await self.respond(method, target, headers, body)
+                except Exception as e:
+                    # Answer instead of dropping the connection without a response
+                    print_error(f"Error handling {method} {target}: {e!r}")
+                    status, content_type, payload = 500, 'text/plain', b'Internal server error'
+                keep_alive = (http_version == 'HTTP/1.1'
+                              and headers.get('connection', '').lower() != 'close')
+                await self.send(writer, status, content_type, payload, keep_alive,
+                                head_only=method == 'HEAD')
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+    
+    async def send(self, writer, status, content_type, payload, keep_alive=True, head_only=False):
+        """Write one HTTP response"""
+        from http import HTTPStatus
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + (b'' if head_only else payload))
+        await writer.drain()
+    
+    async def serve_forever(self, host='127.0.0.1', port=8000, quiet=False):
+        """Listen on host:port until cancelled"""
+        import asyncio
+        self.start_pool()
+        try:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            async with server:
+                if not quiet:
+                    print_info(f"Serving QR codes on http://{host}:{port}/qr (Ctrl+C to stop)")
+                await server.serve_forever()
+        finally:
+            self.close()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate QR codes from text input with customization options",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  %(prog)s "Hello World"
+  %(prog)s "https://example.com" -o website.png -s 15 -b 2
+  %(prog)s "Contact: +1234567890" -f blue -bg yellow -e H
+  %(prog)s --interactive
+  %(prog)s "My Text" --logo logo.png --rounded
+  %(prog)s "https://example.com" --format TERM
+  %(prog)s "My Text" -o code.png --rendition size=2,border=1 --rendition format=SVG
+  %(prog)s --batch urls.txt -o url.png --jobs 8
+  %(prog)s --batch urls.txt -o url.png --resume
+  %(prog)s --batch codes.csv -o code.png --jobs 4
+  %(prog)s --batch urls.txt -o url.png --archive codes.zip
+  %(prog)s --serve --port 8000 --jobs 4
+  generate-urls | %(prog)s --batch - -o url.png --quiet
+        """
+    )
+    
+    # Main arguments
+    parser.add_argument('text', nargs='?', help='Text to encode in QR code')
+    parser.add_argument('-o', '--output',
+                       help='Output filename, - for stdout (default: qrcode.png; stdout for TERM and MATRIX)')
+    
+    # QR Code parameters
+    parser.add_argument('-s', '--size', type=int, default=10, 
+                       help='Box size for each module (default: 10)')
+    parser.add_argument('-b', '--border', type=int, default=4, 
+                       help='Border size in modules (default: 4)')
+    parser.add_argument('-e', '--error-correction', choices=['L', 'M', 'Q', 'H'], 
+                       default='M', help='Error correction level (default: M)')
+    parser.add_argument('-v', '--version', type=int, choices=range(1, 41), 
+                       help='QR code version (1-40, auto if not specified)')
+    
+    # Styling options
+    parser.add_argument('-f', '--fill-color', default='black', 
+                       help='Fill color for QR modules (default: black)')
+    parser.add_argument('-bg', '--back-color', default='white', 
+                       help='Background color (default: white)')
+    
+    # Additional features
+    parser.add_argument('--logo', help='Path to logo image to embed in QR code')
+    parser.add_argument('--logo-size', type=float, default=0.2, 
+                       help='Logo size ratio (0.1-0.4, default: 0.2)')
+    parser.add_argument('--rounded', action='store_true',
+                       help='Add rounded corners to QR code')
+    parser.add_argument('--format', choices=['PNG', 'JPEG', 'BMP', 'TIFF', 'SVG', 'TERM', 'MATRIX'], default='PNG',
+                       help='Output format (default: PNG, supports: PNG, JPEG, BMP, TIFF, SVG, '
+                            'TERM for Unicode half-blocks and MATRIX for rows of 0/1 modules)')
+    
+    parser.add_argument('--rendition', action='append', metavar='SPEC',
+                       help='Also render the code this way besides the -o output, encoding it only once; '
+                            'SPEC is comma-separated name=value options, e.g. format=SVG or '
+                            'size=2,border=1,output=thumb.png (repeatable; unset options come from '
+                            'the command line, the default output is <output stem>_<n>)')
+    
+    parser.add_argument('--invert', action='store_true',
+                       help='For TERM, draw the light modules instead of the dark ones '
+                            '(for light text on a dark terminal)')
+    
+    # Output encoding
+    parser.add_argument('--compact', action='store_true',
+                       help='Keep plain codes as 1-bit/2-colour palette images for smaller files')
+    parser.add_argument('--compress-level', type=int, choices=range(0, 10), metavar='0-9',
+                       help='PNG zlib level, or TIFF compression on/off (0 = fastest/none, 9 = smallest)')
+    parser.add_argument('--optimize', action='store_true',
+                       help='Spend extra time finding the smallest PNG encoding')
+    
+    # Modes
+    parser.add_argument('-i', '--interactive', action='store_true', 
+                       help='Run in interactive mode')
+    parser.add_argument('--batch', help='Batch process from file (one text per line, CSV or JSONL rows, - for stdin); '
+                                        'line N without its own output goes to <output stem>_N<suffix> in the working directory')
+    parser.add_argument('--batch-format', choices=['auto', 'lines', 'csv', 'jsonl'], default='auto',
+                       help='Batch input format; CSV/JSONL rows set text and may override output, logo '
+                            'and --serve parameters (default: auto, from the file extension)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                       help='Worker processes for batch mode (default: 1, 0 = all cores)')
+    parser.add_argument('--writers', type=int, default=BATCH_WRITERS,
+                       help=f'Threads writing batch outputs while encoding continues '
+                            f'(default: {BATCH_WRITERS}, 0 = write inline)')
+    parser.add_argument('--cache-dir', help='Reuse previously generated codes stored in this directory')
+    parser.add_argument('--archive', metavar='PATH',
+                       help='Write batch outputs as entries of one archive instead of separate files '
+                            '(.zip, .tar, .tar.gz/.tgz; - streams a tar to stdout and implies --quiet)')
+    parser.add_argument('--archive-format', choices=ArchiveSink.FORMATS,
+                       help='Archive format for --archive (default: from the file extension, tar for -)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Record finished batch lines in a checkpoint and skip those already done '
+                            '(rerun the same command to continue an interrupted batch)')
+    parser.add_argument('--checkpoint', metavar='PATH',
+                       help='Checkpoint file for --resume (default: <output stem>.checkpoint in the working directory)')
+    parser.add_argument('--serve', action='store_true',
+                       help='Run a local HTTP server returning QR images (GET /qr?text=...)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address for --serve (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='Port for --serve (default: 8000)')
+    parser.add_argument('--stats', metavar='PATH',
+                       help='Write per-stage timings, peak memory and versions used to PATH (- for stdout)')
+    parser.add_argument('--stats-format', choices=['json', 'prometheus'],
+                       help='Format for --stats (default: prometheus for .prom files, otherwise json)')
+    parser.add_argument('--quiet', action='store_true', help='Suppress output messages')
+    
+    args = parser.parse_args()
+    if args.output is None:
+        if args.format not in TEXT_FORMATS:
+            args.output = 'qrcode.png'
+        else:
+            args.output = 'qrcode.txt' if args.batch else '-'
+    
+    if args.rendition and (args.batch or args.serve):
+        print_error(f"--rendition cannot be used with {'--batch' if args.batch else '--serve'}")
+        sys.exit(1)
+    
+    # Interactive mode
+    if args.interactive:
+        interactive_mode()
+        return
+    
+    # Server mode
+    if args.serve:
+        if args.jobs < 0:
+            print_error("Number of jobs must be 0 (all cores) or greater")
+            sys.exit(1)
+        defaults = batch_options_from_args(args)
+        error = validate_options(defaults)
+        if error:
+            print_error(error)
+            sys.exit(1)
+        import asyncio
+        server = QRServer(defaults, jobs=args.jobs or os.cpu_count() or 1)
+        try:
+            asyncio.run(server.serve_forever(args.host, args.port, quiet=args.quiet))
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print_error(f"Could not start server: {e}")
+            sys.exit(1)
+        return
+    
+    # Batch mode
+    if args.batch:
+        if args.batch != '-' and not os.path.exists(args.batch):
+            print_error(f"Batch file not found: {args.batch}")
+            sys.exit(1)
+        
+        if args.jobs < 0:
+            print_error("Number of jobs must be 0 (all cores) or greater")
+            sys.exit(1)
+        
+        if args.writers < 0:
+            print_error("Number of writers must be 0 or greater")
+            sys.exit(1)
+        
+        if args.archive and args.resume:
+            print_error("--resume cannot be used with --archive")
+            sys.exit(1)
+        
+        if args.archive == '-' and args.stats == '-':
+            print_error("--stats - cannot be used with --archive -, as stdout carries the archive")
+            sys.exit(1)
+        
+        if args.archive == '-':
+            # stdout carries the archive
+            args.quiet = True
+            
+        try:
+            options = batch_options_from_args(args)
+            stats = StageStats() if args.stats else None
+            checkpoint = None
+            if args.resume:
+                checkpoint = BatchCheckpoint(args.checkpoint or batch_checkpoint_path(args.output)).load()
+            sink = ArchiveSink(args.archive, args.archive_format) if args.archive else None
+            try:
+                success_count, total = run_batch(iter_batch_rows(args.batch, options, args.batch_format), options,
+                                                 jobs=args.jobs or os.cpu_count() or 1,
+                                                 quiet=args.quiet, stats=stats, checkpoint=checkpoint,
+                                                 writers=args.writers, sink=sink)
+            finally:
+                if sink is not None:
+                    sink.close()
+            if stats is not None:
+                stats.write(args.stats, args.stats_format)
+            if checkpoint is not None and checkpoint.skipped and not args.quiet:
+                print_info(f"Skipped {checkpoint.skipped} lines already written by an earlier run")
+            
+            if not total:
+                print_error("Batch file is empty or contains no valid lines")
+                sys.exit(1)
+            
+            if not args.quiet:
+                print_success(f"Batch processing complete! Generated {success_count}/{total} QR codes.")
+                
+        except Exception as e:
+            print_error(f"Batch processing error: {e}")
+            sys.exit(1)
+        return
+    
+    # Standard mode - require text input
+    if not args.text:
+        parser.print_help()
+        print(f"\n{Fore.YELLOW}💡 Tip: Use --interactive for guided QR code generation{Style.RESET_ALL}")
+        sys.exit(1)
+    
+    # Validate parameters
+    if args.size < 1 or args.size > 50:
+        print_error("Box size must be between 1 and 50")
+        sys.exit(1)
+    
+    if args.border < 0 or args.border > 20:
+        print_error("Border size must be between 0 and 20")
+        sys.exit(1)
+    
+    if args.logo_size < 0.1 or args.logo_size > 0.4:
+        print_error("Logo size ratio must be between 0.1 and 0.4")
+        sys.exit(1)
+    
+    # Validate colors
+    if not validate_color(args.fill_color):
+        print_error(f"Invalid fill color: {args.fill_color}")
+        print_info("Use color names (red, blue, etc.) or hex codes (#FF0000)")
+        sys.exit(1)
+    
+    if not validate_color(args.back_color):
+        print_error(f"Invalid background color: {args.back_color}")
+        print_info("Use color names (red, blue, etc.) or hex codes (#FF0000)")
+        sys.exit(1)
+    
+    # Generate QR code
+    generator = QRGenerator(stats=StageStats() if args.stats else None)
+    to_stdout = args.output == '-'
+    if to_stdout and args.stats == '-':
+        print_error("--stats - cannot be used with output to stdout")
+        sys.exit(1)
+    if to_stdout:
+        # stdout carries the code
+        args.quiet = True
+    
+    if args.rendition:
+        if to_stdout:
+            print_error("--rendition cannot be used with output to stdout")
+            sys.exit(1)
+        # The -o output is the first rendition
+        defaults = batch_options_from_args(args)
+        renditions = [defaults]
+        for index, spec in enumerate(args.rendition, 1):
+            options, error = parse_rendition(spec, defaults, index)
+            if error:
+                print_error(f"Invalid rendition '{spec}': {error}")
+                sys.exit(1)
+            renditions.append(options)
+        outputs = [os.path.abspath(options['output']) for options in renditions]
+        if len(set(outputs)) < len(outputs):
+            print_error("Each rendition needs its own output file")
+            sys.exit(1)
+        if not args.quiet:
+            print_info(f"Generating {len(renditions)} renditions...")
+        success_count = save_renditions(generator, args.text, defaults, renditions, quiet=args.quiet)
+        if generator.stats is not None:
+            generator.stats.write(args.stats, args.stats_format)
+        if success_count < len(renditions):
+            sys.exit(1)
+        if not args.quiet:
+            print_info(f"Text encoded: {args.text}")
+        return
+    
+    try:
+        cache = ResultCache(args.cache_dir) if args.cache_dir and not to_stdout else None
+        if cache is not None:
+            cache_key = result_cache_key(args.text, batch_options_from_args(args))
+            if cache.fetch(cache_key, args.output):
+                if generator.stats is not None:
+                    generator.stats.count('cache_hits')
+                    generator.stats.write(args.stats, args.stats_format)
+                if not args.quiet:
+                    print_success(f"QR code saved as: {args.output} (from cache)")
+                    print_info(f"Text encoded: {args.text}")
+                return
+        
+        if not args.quiet:
+            print_info("Generating QR code...")
+        
+        img, error = generator.generate_qr(
+            args.text,
+            box_size=args.size,
+            border=args.border,
+            fill_color=args.fill_color,
+            back_color=args.back_color,
+            error_correction=args.error_correction,
+            version=args.version,
+            format_type=args.format,
+            compact=args.compact,
+            invert=args.invert
+        )
+        
+        if error:
+            print_error(f"Error generating QR code: {error}")
+            sys.exit(1)
+        
+        # Add logo and rounded corners if requested (not supported for SVG)
+        if args.format != 'SVG':
+            if args.logo and not args.quiet:
+                print_info("Adding logo...")
+            if args.rounded and not args.quiet:
+                print_info("Adding rounded corners...")
+            img, warnings = generator.decorate_qr(img, args.logo, args.logo_size, args.rounded,
+                                                  flatten=args.format == 'JPEG')
+            if not args.quiet:
+                for _, warning in warnings:
+                    print_warning(warning)
+        
+        # Save QR code
+        success, result = generator.save_qr(img, sys.stdout.buffer if to_stdout else args.output,
+                                            args.format, args.compress_level, args.optimize)
+        
+        if success:
+            if cache is not None:
+                cache.store(cache_key, result)
+            if generator.stats is not None:
+                generator.stats.write(args.stats, args.stats_format)
+            if not args.quiet:
+                print_success(f"QR code saved as: {result}")
+                print_info(f"Text encoded: {args.text}")
+                if hasattr(img, 'mode'):
+                    print_info(f"Image size: {img.size[0]}x{img.size[1]} pixels")
+                
+                # Display additional info
+                error_levels = {'L': '~7%', 'M': '~15%', 'Q': '~25%', 'H': '~30%'}
+                print_info(f"Error correction: {args.error_correction} ({error_levels[args.error_correction]})")
+        else:
+            print_error(f"Failed to save QR code: {result}")
+            sys.exit(1)
+            
+    except KeyboardInterrupt:
+        print_error("\nOperation cancelled by user")
+        sys.exit(1)
+    except Exception as e:
+        print_error(f"Unexpected error: {e}")
+        sys.exit(1)
@@ -0,0 +1,18 @@
+"""Shared fixtures for running the qrgenn.py CLI"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def run_cli(tmp_path):
+    """Run qrgenn.py with arguments in tmp_path, returning the CompletedProcess"""
+    def run(*args, text=True):
+        return subprocess.run([sys.executable, str(ROOT / 'qrgenn.py'), *args], cwd=tmp_path,
+                              capture_output=True, text=text, timeout=120)
+    return run
@@ -0,0 +1,209 @@
+"""
+Behaviour tests for batch mode
+Bad rows must be reported without stopping the run, and every good row
+must still get its output.
+"""
+
+import os
+import sys
+import tarfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrgenn_core
+
+# Batch options as the CLI builds them with its default settings
+DEFAULTS = {'output': 'qrcode.png', 'box_size': 10, 'border': 4, 'fill_color': 'black',
+            'back_color': 'white', 'error_correction': 'M', 'version': None, 'format_type': 'PNG',
+            'logo': None, 'logo_size': 0.2, 'rounded': False, 'compact': False, 'invert': False,
+            'compress_level': None, 'optimize': False, 'cache_dir': None, 'archive': False}
+
+
+def test_jsonl_bad_rows_between_good_rows(tmp_path, run_cli):
+    (tmp_path / 'rows.jsonl').write_text(
+        '{"text": "first", "output": "first.png"}\n'
+        '{"text": "huge", "size": 1e400, "output": "huge.png"}\n'
+        '{"text": "fraction", "size": 2.9, "output": "fraction.png"}\n'
+        '{"text": "last", "size": 3.0, "output": "last.png"}\n')
+    result = run_cli('--batch', 'rows.jsonl')
+    assert result.returncode == 0, result.stderr
+    messages = result.stdout + result.stderr
+    assert "Invalid line 2: Invalid value for size" in messages
+    assert "Invalid line 3: Invalid value for size: 2.9" in messages
+    assert "Generated 2/4" in result.stdout
+    assert sorted(path.name for path in tmp_path.glob('*.png')) == ['first.png', 'last.png']
+
+
+def test_grouped_chunks_never_hold_a_row_far_back():
+    svg, png = {'format_type': 'SVG'}, {'format_type': 'PNG'}
+    items = [qrgenn_core.BatchItem(index, str(index), svg if index == 1 else png, None, None, None, None)
+             for index in range(1, 201)]
+    chunks = list(qrgenn_core._grouped_chunks(iter(items), size=16, window=64))
+    svg_chunk = next(position for position, (options, _) in enumerate(chunks) if options is svg)
+    # The lone SVG row goes out once it is window lines old, not at the end
+    assert sum(len(rows) for _, rows in chunks[:svg_chunk]) <= 64
+    assert sorted(index for _, rows in chunks for index, _, _ in rows) == list(range(1, 201))
+
+    # A consumer waiting for the row gets its chunk before any other
+    wanted = [1]
+    first_options, first_rows = next(qrgenn_core._grouped_chunks(iter(items), size=16, window=64,
+                                                                 wanted=wanted))
+    assert first_options is svg and first_rows == [(1, '1', None)]
+
+
+def test_archive_rejects_output_collisions_and_reuses_repeats(tmp_path, run_cli):
+    (tmp_path / 'rows.csv').write_text('text,output\nsame,a.png\nother,a.png\nsame,b.png\nsame,/a.png\n')
+    result = run_cli('--batch', 'rows.csv', '--archive', 'out.zip')
+    assert result.returncode == 0, result.stderr
+    assert "Invalid line 2: Output a.png is already used by line 1" in result.stderr
+    with zipfile.ZipFile(tmp_path / 'out.zip') as archive:
+        assert archive.namelist() == ['a.png', 'b.png']
+        assert archive.read('a.png') == archive.read('b.png')
+
+
+def test_checkpoint_load_drops_a_torn_last_line(tmp_path):
+    key = qrgenn_core.result_cache_key('hello', {})
+    path = tmp_path / 'run.checkpoint'
+    path.write_bytes(f"1 {key[:16]}\n2 {key[:8]}".encode('ascii'))
+    checkpoint = qrgenn_core.BatchCheckpoint(path).load()
+    assert list(checkpoint.done) == [1]
+    # The torn line is cut off, so later appends start on a fresh line
+    assert path.read_bytes() == f"1 {key[:16]}\n".encode('ascii')
+
+    (tmp_path / 'out.png').write_bytes(b'')
+    assert checkpoint.is_done(1, key, tmp_path / 'out.png')
+    assert not checkpoint.is_done(1, qrgenn_core.result_cache_key('changed', {}), tmp_path / 'out.png')
+    assert not checkpoint.is_done(1, key, tmp_path / 'missing.png')
+
+    checkpoint.record(2, key)
+    checkpoint.flush()
+    assert set(qrgenn_core.BatchCheckpoint(path).load().done) == {1, 2}
+
+
+def test_resume_skips_lines_already_written(tmp_path, run_cli):
+    (tmp_path / 'lines.txt').write_text('one\ntwo\nthree\n')
+    assert run_cli('--batch', 'lines.txt', '--resume').returncode == 0
+    assert (tmp_path / 'qrcode.checkpoint').exists()
+
+    (tmp_path / 'qrcode_2.png').unlink()
+    (tmp_path / 'lines.txt').write_text('one\ntwo\nchanged\n')
+    result = run_cli('--batch', 'lines.txt', '--resume')
+    assert result.returncode == 0, result.stderr
+    # Line 1 is skipped; line 2 lost its output and line 3 changed, so both are redone
+    assert "Skipped 1 lines already written by an earlier run" in result.stdout
+    assert "Generated qrcode_2.png" in result.stdout and "Generated qrcode_3.png" in result.stdout
+    assert "Generated qrcode_1.png" not in result.stdout
+
+
+def test_batch_row_reports_bad_rows():
+    shared = {}
+    row = qrgenn_core.batch_row
+    assert row({'text': 'a', 'colour': 'red'}, DEFAULTS, shared).error == "Unknown parameter: colour"
+    assert row({'text': 'a', 'size': 'big'}, DEFAULTS, shared).error == "Invalid value for size: big"
+    assert row({'text': 'a', 'border': 1.5}, DEFAULTS, shared).error == "Invalid value for border: 1.5"
+    assert row({'text': ''}, DEFAULTS, shared).error == "Text cannot be empty!"
+    assert row({'text': 'a', 'size': '99'}, DEFAULTS, shared).error == "Box size must be between 1 and 50"
+    assert row({'text': 'a', None: ['extra']}, DEFAULTS, shared).error == "more fields than the header"
+    assert not shared
+
+    first = row({'text': 'a', 'size': '5', 'output': 'a.png'}, DEFAULTS, shared)
+    second = row({'text': 'b', 'size': 5.0, 'fill_color': ''}, DEFAULTS, shared)
+    assert first.error is None and first.output == 'a.png' and first.options['box_size'] == 5
+    # Rows with the same settings share one options dict
+    assert second.options is first.options and second.output is None
+    svg = row({'text': 'c', 'format': 'svg'}, DEFAULTS, shared)
+    assert svg.options['format_type'] == 'SVG' and svg.options['output'] == 'qrcode.svg'
+
+
+def dedupe(rows, **kwargs):
+    """Run _dedupe_batch over (text, output) pairs or error strings, numbered from 1"""
+    batch_rows = [qrgenn_core.BatchRow(None, None, None, row) if isinstance(row, str)
+                  else qrgenn_core.BatchRow(row[0], DEFAULTS, row[1], None) for row in rows]
+    return list(qrgenn_core._dedupe_batch(enumerate(batch_rows, 1), **kwargs))
+
+
+def test_dedupe_batch_marks_repeats_and_output_collisions():
+    items = dedupe([('a', None), ('a', 'copy.png'), 'bad row', ('b', 'copy.png'),
+                    ('a', 'copy.png'), ('c', 'qrcode_1.png')])
+    assert [item.first[0] if item.first else None for item in items] == [1, 1, None, None, 1, None]
+    assert items[0].output == 'qrcode_1.png' and items[1].output == 'copy.png'
+    assert items[2].error == "bad row"
+    assert items[3].error == "Output copy.png is already used by line 2"
+    # The same payload may name the same output again
+    assert items[4].error is None
+    assert items[5].error == "Output qrcode_1.png is already used by line 1"
+
+    # Without a window every line stands alone
+    items = dedupe([('a', 'x.png'), ('a', 'x.png'), ('b', 'x.png')], window=0)
+    assert [item.first[0] for item in items] == [1, 2, 3]
+    assert all(item.error is None for item in items)
+
+
+def test_copy_batch_duplicate(tmp_path):
+    first_output = tmp_path / 'first.png'
+    first_output.write_bytes(b'code')
+    first = [1, True, str(first_output), None]
+
+    success, messages = qrgenn_core.copy_batch_duplicate(2, 'a', first, str(tmp_path / 'sub' / 'copy.png'))
+    assert success and messages[0][0] == 'success'
+    assert (tmp_path / 'sub' / 'copy.png').read_bytes() == b'code'
+
+    # A repeat naming the output of its first occurrence must leave it intact
+    os.link(first_output, tmp_path / 'linked.png')
+    for same in (str(first_output), str(tmp_path / 'sub' / '..' / 'first.png'), str(tmp_path / 'linked.png')):
+        assert qrgenn_core.copy_batch_duplicate(3, 'a', first, same)[0]
+        assert first_output.read_bytes() == b'code'
+
+    success, messages = qrgenn_core.copy_batch_duplicate(4, 'a', [1, False, str(first_output), None],
+                                                         str(tmp_path / 'other.png'))
+    assert not success and "same input as failed line 1" in messages[0][1]
+    assert not (tmp_path / 'other.png').exists()
+
+
+@pytest.mark.parametrize('output, entry', [
+    ('code.png', 'code.png'),
+    ('sub/dir/code.png', 'sub/dir/code.png'),
+    ('./sub/../code.png', 'code.png'),
+    ('/abs/code.png', 'abs/code.png'),
+    ('../../code.png', 'code.png'),
+])
+def test_archive_entry_names_stay_inside_the_archive(output, entry):
+    assert qrgenn_core.ArchiveSink.entry_name(output) == entry
+
+
+@pytest.mark.parametrize('archive_format', qrgenn_core.ArchiveSink.FORMATS)
+def test_archive_is_reproducible_with_source_date_epoch(tmp_path, monkeypatch, archive_format):
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1700000000')
+    archives = []
+    for run, clock in enumerate((1800000000.0, 1900000000.0)):
+        # Runs at different times must still give the same bytes
+        monkeypatch.setattr(qrgenn_core.time, 'time', lambda clock=clock: clock)
+        path = tmp_path / f"run{run}.{archive_format}"
+        sink = qrgenn_core.ArchiveSink(str(path))
+        assert sink.format == archive_format
+        sink.add('a.png', b'first')
+        sink.add('sub/b.svg', b'second')
+        sink.close()
+        archives.append(path.read_bytes())
+    assert archives[0] == archives[1]
+
+    if archive_format == 'zip':
+        with zipfile.ZipFile(tmp_path / 'run0.zip') as archive:
+            assert archive.namelist() == ['a.png', 'sub/b.svg']
+            assert archive.read('sub/b.svg') == b'second'
+    else:
+        with tarfile.open(tmp_path / f"run0.{archive_format}") as archive:
+            assert archive.getnames() == ['a.png', 'sub/b.svg']
+            assert {member.mtime for member in archive.getmembers()} == {1700000000}
+
+
+def test_batch_outputs_go_to_the_working_directory(tmp_path, run_cli):
+    (tmp_path / 'urls.txt').write_text('https://example.com/1\nhttps://example.com/2\n')
+    result = run_cli('--batch', 'urls.txt', '-o', 'codes/url.png', '--resume')
+    assert result.returncode == 0, result.stderr
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['url.checkpoint', 'url_1.png', 'url_2.png',
+                                                                 'urls.txt']
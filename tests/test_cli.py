@@ -0,0 +1,27 @@
+"""
+Behaviour tests for the command line
+When stdout carries the output, messages must stay off it.
+"""
+
+
+def test_term_error_goes_to_stderr(run_cli):
+    result = run_cli('x' * 8000, '--format', 'TERM')
+    assert result.returncode == 1
+    assert result.stdout == ''
+    assert "Error generating QR code" in result.stderr
+
+
+def test_empty_batch_archive_to_stdout_keeps_the_stream_clean(tmp_path, run_cli):
+    (tmp_path / 'empty.txt').write_text('')
+    result = run_cli('--batch', 'empty.txt', '--archive', '-', '--archive-format', 'tar', text=False)
+    assert result.returncode == 1
+    assert "Batch file is empty".encode() in result.stderr
+    assert "Batch file is empty".encode() not in result.stdout
+
+
+def test_rendition_is_rejected_with_batch(tmp_path, run_cli):
+    (tmp_path / 'n.txt').write_text('hello\n')
+    result = run_cli('--batch', 'n.txt', '--rendition', 'size=2,output=small.png')
+    assert result.returncode == 1
+    assert "--rendition cannot be used with --batch" in result.stderr
+    assert not list(tmp_path.glob('*.png'))
@@ -0,0 +1,113 @@
+"""
+Regression tests for the fast encode and render engine
+NumpyQRCode, render_modules and fit_version must give exactly what stock
+qrcode gives: the same modules and mask, the same pixels, and never a
+larger version.
+"""
+
+import random
+import string
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrcode
+import qrgenn
+
+LEVELS = (qrcode.constants.ERROR_CORRECT_L, qrcode.constants.ERROR_CORRECT_M,
+          qrcode.constants.ERROR_CORRECT_Q, qrcode.constants.ERROR_CORRECT_H)
+
+
+def random_texts(count, seed=0):
+    """Deterministic numeric, alphanumeric, byte and non-ASCII texts of mixed lengths"""
+    rng = random.Random(seed)
+    alphabets = (string.digits, string.digits + string.ascii_uppercase + ' $%*+-./:',
+                 string.ascii_letters + string.punctuation, string.ascii_lowercase + 'äöü€日本')
+    for _ in range(count):
+        # Mixed runs exercise segment switching
+        parts = [''.join(rng.choice(rng.choice(alphabets)) for _ in range(rng.randint(1, 60)))
+                 for _ in range(rng.randint(1, 4))]
+        yield ''.join(parts) * rng.choice((1, 1, 2, 8))
+
+
+def stock_qr(segments, version, error_correction):
+    """qrcode's own QRCode for the same segments and version"""
+    qr = qrcode.QRCode(version=version, error_correction=error_correction)
+    for segment in segments:
+        qr.add_data(segment)
+    qr.make(fit=False)
+    return qr
+
+
+def test_fit_version_matches_best_fit():
+    for index, text in enumerate(random_texts(100)):
+        error_correction = LEVELS[index % 4]
+        try:
+            version, segments = qrgenn.fit_version(text, error_correction)
+        except qrcode.exceptions.DataOverflowError:
+            continue
+        qr = qrcode.QRCode(error_correction=error_correction)
+        for segment in segments:
+            qr.add_data(segment)
+        assert qr.best_fit() == version, text
+        # Never larger than qrcode fitting the text on its own
+        stock = qrcode.QRCode(error_correction=error_correction)
+        stock.add_data(text)
+        assert version <= stock.best_fit(), text
+
+
+def test_fit_version_respects_min_version():
+    version, _ = qrgenn.fit_version('hello', qrcode.constants.ERROR_CORRECT_M, 12)
+    assert version == 12
+
+
+def test_numpy_qrcode_matches_stock():
+    pytest.importorskip('numpy')
+    qrgenn.load_numpy()
+    for index, text in enumerate(random_texts(80, seed=1)):
+        error_correction = LEVELS[index % 4]
+        try:
+            version, segments = qrgenn.fit_version(text, error_correction)
+        except qrcode.exceptions.DataOverflowError:
+            continue
+        fast = qrgenn.NumpyQRCode(version=version, error_correction=error_correction)
+        for segment in segments:
+            fast.add_data(segment)
+        fast.make(fit=False)
+        assert fast.modules == stock_qr(segments, version, error_correction).modules, text
+
+
+@pytest.mark.parametrize('version', [1, 2, 7, 10, 25, 40])
+def test_numpy_qrcode_matches_stock_per_version(version):
+    pytest.importorskip('numpy')
+    qrgenn.load_numpy()
+    segments = [qrcode.util.QRData(b'mask', mode=qrcode.util.MODE_8BIT_BYTE)]
+    for error_correction in LEVELS:
+        fast = qrgenn.NumpyQRCode(version=version, error_correction=error_correction)
+        fast.add_data(segments[0])
+        fast.make(fit=False)
+        assert fast.modules == stock_qr(segments, version, error_correction).modules
+
+
+@pytest.mark.parametrize('fill_color, back_color', [
+    ('black', 'white'), ('red', '#eeeeee'), ((0, 0, 128), (255, 255, 200)), ('BLACK', 'WHITE'),
+])
+def test_render_modules_matches_make_image(fill_color, back_color):
+    pytest.importorskip('numpy')
+    for version in (1, 10, 40):
+        for box_size, border in ((1, 0), (3, 4), (10, 2)):
+            qr = qrcode.QRCode(version=version, box_size=box_size, border=border)
+            qr.add_data('render')
+            qr.make(fit=False)
+            expected = qr.make_image(fill_color=fill_color, back_color=back_color).get_image()
+            actual = qrgenn.render_modules(qr.modules, box_size, border, fill_color, back_color)
+            assert actual.mode == expected.mode
+            assert actual.tobytes() == expected.tobytes()
+
+
+def test_render_modules_declines_transparent_background():
+    pytest.importorskip('numpy')
+    assert qrgenn.render_modules([[True]], 1, 0, 'black', 'transparent') is None
@@ -0,0 +1,46 @@
+"""
+Behaviour tests for --serve
+Every request gets a response, even when handling it fails.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import qrgenn_core
+
+
+def exchange(server, request):
+    """Send raw request bytes to server over a local connection, returning all response bytes"""
+    async def run():
+        listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            return response
+    return asyncio.run(run())
+
+
+def test_overflowing_json_number_is_a_bad_request():
+    body = b'{"text": "x", "size": 1e400}'
+    response = exchange(qrgenn_core.QRServer({}), b'POST /qr HTTP/1.1\r\nConnection: close\r\n'
+                        b'Content-Type: application/json\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+    assert response.startswith(b'HTTP/1.1 400 ')
+    assert response.endswith(b'Invalid value for size: inf')
+
+
+def test_unexpected_error_is_answered_with_500():
+    class BrokenServer(qrgenn_core.QRServer):
+        async def respond(self, method, target, headers, body):
+            raise OverflowError("boom")
+
+    response = exchange(BrokenServer({}), b'GET /qr?text=a HTTP/1.1\r\n\r\n'
+                        b'GET /qr?text=b HTTP/1.1\r\nConnection: close\r\n\r\n')
+    # The connection stays usable for the next request
+    assert response.count(b'HTTP/1.1 500 Internal Server Error\r\n') == 2